@@ -140,6 +140,8 @@ setup(
     extras_require={  # Optional
         "dev": ["check-manifest", "python-dotenv>=0.15.0", "pandas>=1.1.4", "openpyxl"],
         "test": ["coverage"],
+        "async": ["aiohttp>=3.8"],
+        "export": ["pyarrow", "openpyxl"],
     },
     # If there are data files included in your packages that need to be
     # installed, specify them here.
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import time
+
+from idms.api.contentserver import baseCrawler, dotfield, parentChain, retryAfter
+from idms.visited import visitedSet
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+
+class asynccrawler(baseCrawler):
+    """
+    asyncio variant of `crawler`, all requests of one client share an `aiohttp.ClientSession` and overlap on the event
+    loop up to `maxConcurrency` requests at a time.
+
+    Example:
+    async with asynccrawler(baseUrl, username, password) as idms:
+        rows = await idms.children(startNode)
+        async for page in idms.search_pages("overdevest prox[1,f] daniel"):
+            ...
+    """
+
+    def __init__(
+        self,
+        baseUrl: str,
+        username: str = None,
+        password: str = None,
+        ticket: str = None,
+        verifySSL: bool = True,
+        maxErrorRetry: int = 10,
+        post_error_retries: int = 10,
+        maxConcurrency: int = 20,
+    ):
+        if aiohttp is None:
+            raise ImportError("asynccrawler requires aiohttp, install it with: pip install idms[async]")
+        super().__init__(baseUrl, maxErrorRetry)
+        self.username = username
+        self.password = password
+        self.ticket = ticket
+        self.verifySSL = verifySSL
+        self.post_error_retries = post_error_retries
+        self.maxConcurrency = maxConcurrency
+        self.timeoutSeconds = 60 * 30
+        self.session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        """
+        Create the http session (must run inside the event loop) and authorize if no ticket was given.
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.maxConcurrency, ssl=None if self.verifySSL else False)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeoutSeconds)
+            )
+            self._semaphore = asyncio.Semaphore(self.maxConcurrency)
+        if not self.ticket:
+            self.ticket = await self.authorize(self.username, self.password)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _requestJson(self, method: str, url: str, **kwargs) -> dict:
+        """
+        Send a request and return the json body, paced by `self.rateLimiter`. Retries on 429 and 5xx like the
+        `Retry` adapter of `crawler`.
+        """
+        if self.session is None:
+            await self.open()
+        attempt = 0
+        while True:
+            wait = self.rateLimiter.reserve() if self.rateLimiter is not None else 0
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self._semaphore:
+                start = time.monotonic()
+                async with self.session.request(method, url, **kwargs) as r:
+                    body = await r.read()
+                    latency = time.monotonic() - start
+                    if self.rateLimiter is not None:
+                        self.rateLimiter.record(latency, r.status, retryAfter(r.headers))
+                    if self.metrics is not None:
+                        sent = int(r.request_info.headers.get("Content-Length") or 0)
+                        self.metrics.recordRequest(method, url, r.status, latency, sent, len(body), int(attempt > 0))
+                    if r.status in (429, 500, 502, 503, 504) and attempt < self.post_error_retries:
+                        logging.debug(f"Retry {attempt} for {url}: HTTP {r.status}")
+                    else:
+                        r.raise_for_status()
+                        return json.loads(body) if body.strip() else None
+            if r.status != 429:
+                await asyncio.sleep(2**attempt)
+            attempt = attempt + 1
+
+    async def authorize(self, username: str, password: str) -> str:
+        """
+        Function to authenticate yourself and get token for future requests.
+        """
+        url = self.baseUrl + "/api/v1/auth"
+        try:
+            r = await self._requestJson("POST", url, data={"username": username, "password": password})
+        except aiohttp.ClientError:
+            raise Exception("Username or password not correct!")
+        if r.get("error") or not r.get("ticket"):
+            raise Exception("Username or password not correct!")
+        logging.info("Succesfull logged in to ContentServer.")
+        return r.get("ticket")
+
+    async def parents(self, nodeId: str) -> list:
+        """
+        Get all ancestors of a node.
+        """
+        return list(await self.ancestorChain(nodeId))
+
+    async def ancestorChain(self, nodeId: str) -> parentChain:
+        """
+        Ancestors of node as `parentChain`, repeated lookups are served from `ancestorsCache`.
+        """
+        chain = self.ancestorsCache.get(int(nodeId))
+        if chain is None:
+            url = self.baseUrl + f"/api/v1/nodes/{nodeId}/ancestors"
+            logging.debug(f"url: {url}")
+            data = await self._requestJson("GET", url, headers={"otcsticket": self.ticket})
+            chain = parentChain.fromList(data.get("ancestors", []))
+            self.ancestorsCache.put(int(nodeId), chain)
+        return chain
+
+    async def _fetchChildrenPage(self, nodeId: str, page: int, limit: int = 100) -> dict:
+        url = self.baseUrl + f"/api/v2/nodes/{nodeId}/nodes?limit={limit}&page={page}"
+        logging.debug(f"url: {url}")
+        data = await self._requestJson("GET", url, headers={"otcsticket": self.ticket})
+        self._dumpDebugJson(data)
+        if self.metrics is not None:
+            self.metrics.recordPage(len(data.get("results", [])), nodeId)
+        return data
+
+    async def children(self, nodeId: str, parents: list = None, stopRecursive: bool = False) -> list:
+        """
+        Crawl all children of node, pages and subfolders are fetched concurrently.
+        Rows and order are the same as `crawler.children`, only when a folder is reached more than once the place
+        where its rows are listed can differ.
+        """
+        if not parents and self.includeParentsPath:
+            parents = await self.ancestorChain(nodeId)
+        elif not isinstance(parents, parentChain):
+            parents = parentChain.fromList(parents)
+        visited = self.visited if self.visited is not None else visitedSet()
+        if not visited.add(nodeId):
+            logging.info(f"Folder {nodeId} is already crawled.")
+            return []
+        return await self._children(nodeId, parents, stopRecursive, visited)
+
+    async def _children(self, nodeId: str, parents: parentChain, stopRecursive: bool, visited: visitedSet) -> list:
+        limit = 100
+
+        first = await self._fetchChildrenPage(nodeId, 1, limit)
+        page_total = dotfield(first, "collection.paging.page_total", 0) or 0
+        if page_total >= self.maxCallsPerFolder:
+            raise Exception(
+                f"Stopped due page_total ({page_total}) reached the maxCallsPerFolder ({self.maxCallsPerFolder}) limit!"
+            )
+        pages = [first] + list(
+            await asyncio.gather(*[self._fetchChildrenPage(nodeId, page, limit) for page in range(2, page_total + 1)])
+        )
+        dataRows = [result.get("data") for data in pages for result in data.get("results", [])]
+
+        subfolders = {}
+        for i, dataRow in enumerate(dataRows):
+            nodeType = dotfield(dataRow, "properties.type")
+            if nodeType in self.folderTypes and not stopRecursive and visited.add(dotfield(dataRow, "properties.id")):
+                subfolders[i] = self._children(
+                    dotfield(dataRow, "properties.id"),
+                    parents.append(self._parentEntry(dataRow)),
+                    nodeType in self.folderTypesStopRecursive,
+                    visited,
+                )
+        childResults = dict(zip(subfolders.keys(), await asyncio.gather(*subfolders.values())))
+
+        results = []
+        for i, dataRow in enumerate(dataRows):
+            if i in childResults:
+                results.extend(childResults[i])
+            results.append(self.parseNodeColumns(dataRow, parents))
+        return results
+
+    async def search_pages(self, complexQuery: str, limit: int = 10, metadata: str = "true", slice: str = None):
+        """
+        Async generator over the pages of a search query, yields a list of rows per page.
+        """
+        url = self.baseUrl + "/api/v2/search"
+        base_data = {"where": complexQuery, "limit": limit, "metadata": metadata}
+        if slice:
+            base_data["slice"] = slice
+
+        counter = 0
+        while url and counter < self.maxCallsPerFolder:
+            counter = counter + 1
+            post_url, data = self.searchRequestData(url, base_data)
+            logging.debug(data)
+            search_results = await self._requestJson("POST", post_url, headers={"otcsticket": self.ticket}, data=data)
+            self._dumpDebugJson(search_results)
+            rows = [self.parseSearchResult(result, complexQuery) for result in search_results.get("results", [])]
+            if self.metrics is not None:
+                self.metrics.recordPage(len(rows))
+            yield rows
+
+            nextUrl = dotfield(search_results, "collection.paging.links.next.href")
+            url = self.baseUrl + nextUrl if nextUrl else ""
+
+        if counter >= self.maxCallsPerFolder:
+            logging.warning(
+                f"Stopped due counter ({counter}) reached the maxCallsPerFolder ({self.maxCallsPerFolder}) limit!"
+            )
+
+    async def search(self, complexQuery: str, limit: int = 10, metadata: str = "true", slice: str = None) -> list:
+        """
+        Search API endpoint, returns all rows of all pages.
+        """
+        results = []
+        async for rows in self.search_pages(complexQuery, limit, metadata, slice):
+            results.extend(rows)
+        return results
@@ -1,72 +1,211 @@
-import copy
 import datetime
+import hashlib
 import json
 import logging
 import os
+import threading
 import time
-from functools import reduce
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import lru_cache
 from urllib.parse import parse_qs, urlparse, urlunparse
 from urllib.request import pathname2url
 
-import numpy as np
 import requests
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
 import idms.functions as otfunc
+from idms.cache import lruCache
+from idms.debugwriter import debugWriter
+from idms.download import downloadManifest, fileChecksum, safeFileName
+from idms.frontier import frontierQueue
+from idms.journal import crawlJournal
+from idms.pagesize import adaptivePageSize
+from idms.ratelimit import adaptiveRateLimiter
+from idms.rows import compactRowType
+from idms.tickets import ticketManager
+from idms.visited import visitedSet
+
+
+@lru_cache(maxsize=4096)
+def compileKey(input_key: str) -> tuple:
+    """
+    Split a dotted key once into (key, list index) steps, the index is None when the part is not a number.
+
+    Example:
+    compileKey("versions.0.version_number") -> (("versions", None), ("0", 0), ("version_number", None))
+    """
+    steps = []
+    for part in input_key.split("."):
+        index = int(part) if part.lstrip("-").isdigit() else None
+        steps.append((part, index))
+    return tuple(steps)
 
 
 def dotfield(input_dict: dict, input_key: str, notFound=None) -> str:
     """
     Magic function to get nested properties from dictionary writen as level1.level2.level3.
+    A numeric level is used as index when the value is a list.
 
     Example:
     dotfield({"a": {"b": {"c": "def"}}}, "a.b.c") -> "def"
+    dotfield({"a": [{"b": "def"}]}, "a.0.b") -> "def"
+    """
+    value = input_dict
+    for key, index in compileKey(input_key):
+        if not value:
+            return notFound
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif index is not None and isinstance(value, list):
+            value = value[index] if -len(value) <= index < len(value) else notFound
+        else:
+            logging.debug(f"Dotfield error: {type(value).__name__} has no key {key}\n{input_key}")
+            return ""
+    return value
+
 
-    TODO: Add support for list (error: AttributeError: 'list' object has no attribute 'get')
+def retryAfter(headers: dict) -> float:
+    """
+    Seconds of a `Retry-After` response header, None when missing or not a number.
     """
     try:
-        return reduce(lambda d, k: d.get(k) if d else notFound, input_key.split("."), input_dict)
-    except Exception as err:
-        logging.debug(f"Dotfield error: {err}\n{input_key}")
-        return ""
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
 
 
-class crawler:
-    def __init__(
-        self,
-        baseUrl: str,
-        username: str = None,
-        password: str = None,
-        ticket: str = None,
-        verifySSL: bool = True,
-        maxErrorRetry: int = 10,
-        post_error_retries: int = 10,
-    ):
-        # Settings for retry and auto retry if error code 500 is given
-        retry = Retry(
-            total=post_error_retries,
-            read=post_error_retries,
-            connect=post_error_retries,
-            backoff_factor=1,
-            status_forcelist=(500, 502, 503, 504),
-        )
+class columnPlan:
+    """
+    Output columns compiled once to key steps (see `compileKey`), applied per row or per page of rows.
+    Gives the same values as `dotfield` per column without splitting the keys for every row.
+    """
 
-        # Mounts a session for re-use authorization
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        self.steps = [compileKey(column) for column in self.columns]
+
+    def values(self, dataRow: dict) -> list:
+        """
+        Values of the columns in the order of `columns`.
+        """
+        values = []
+        for steps in self.steps:
+            value = dataRow
+            for key, index in steps:
+                if not value:
+                    value = None
+                    break
+                if value.__class__ is dict or isinstance(value, dict):
+                    value = value.get(key)
+                elif index is not None and isinstance(value, list):
+                    value = value[index] if -len(value) <= index < len(value) else None
+                else:
+                    value = ""
+                    break
+            values.append(value)
+        return values
+
+    def extract(self, dataRow: dict, row: dict = None) -> dict:
+        row = {} if row is None else row
+        for column, value in zip(self.columns, self.values(dataRow)):
+            row[column] = value
+        return row
+
+    def extractPage(self, dataRows: list) -> list:
+        return [self.extract(dataRow) for dataRow in dataRows]
+
+
+class parentChain:
+    """
+    Immutable chain of parent entries (same shape as the ancestors API). A subfolder chain shares all entries with
+    the chain of its folder, and the path string of a chain is joined only once.
+
+    Example:
+    chain = parentChain.fromList(ancestors).append({"id": 1, "name": "Map 1"})
+    chain.path -> "Enterprise > Map 1"
+    """
+
+    __slots__ = ("entry", "parent", "length", "_path")
+
+    def __init__(self, entry: dict = None, parent: "parentChain" = None):
+        self.entry = entry
+        self.parent = parent
+        self.length = 0 if parent is None else parent.length + 1
+        self._path = None
+
+    @classmethod
+    def fromList(cls, entries: list) -> "parentChain":
+        chain = cls()
+        for entry in entries or []:
+            chain = chain.append(entry)
+        return chain
+
+    def append(self, entry: dict) -> "parentChain":
+        return parentChain(entry, self)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        entries = []
+        chain = self
+        while chain.parent is not None:
+            entries.append(chain.entry)
+            chain = chain.parent
+        return reversed(entries)
+
+    @property
+    def path(self) -> str:
+        """
+        Names of the chain joined as: Central > Map 1 > Map 2
+        """
+        if self._path is None:
+            # Walk up to the nearest chain with a path (no recursion, chains can be deeper than the stack).
+            chains = []
+            chain = self
+            while chain._path is None and chain.parent is not None:
+                chains.append(chain)
+                chain = chain.parent
+            if chain.parent is None:
+                chain._path = ""
+            for chain in reversed(chains):
+                name = str(chain.entry.get("name"))
+                chain._path = name if chain.parent.parent is None else chain.parent._path + " > " + name
+        return self._path
+
+
+class baseCrawler:
+    """
+    Settings and response parsing shared by the synchronous `crawler` and other Content Server clients.
+    """
+
+    def __init__(self, baseUrl: str, maxErrorRetry: int = 10):
         self.baseUrl = baseUrl
-        self.session = requests.Session()
-        self.session.verify = verifySSL
-        self.session.mount(baseUrl, HTTPAdapter(max_retries=retry))
 
         # Safety measures to not to overload the server.
         self.maxCallsPerFolder = 10000
-        self.gracefulSleepSeconds = 0.01
+        # Fixed pause before each subfolder, the pace of all requests is set by the adaptive `rateLimiter`.
+        self.gracefulSleepSeconds = 0
+        self.rateLimiter = adaptiveRateLimiter()
 
         # Type 0 is always a folder, 751 is for ProvZH and E-mailmap and 136 for Samengesteld document and 298 for a Collectie.
         self.folderTypes = [0, 751, 136, 298]
+        # The children of these types are fetched, but subfolders in them are not crawled further.
         self.folderTypesStopRecursive = [136, 298]
 
+        # Folders of which the children are fetched in a crawl, a folder that is reached again (through a shortcut,
+        # collection or an overlapping start node) is not fetched twice. When set, the `idms.visited.visitedSet` is
+        # shared by all crawls and `visited.duplicates` counts the fetches that were avoided.
+        self.visited = None
+
+        # Optional `idms.metrics.crawlMetrics` to measure requests, pages, rows and folders.
+        self.metrics = None
+
         self.includeParentsPath = True
+        # Rows as `idms.rows.compactRow` (slots, interned strings and urls computed when read) instead of dicts.
+        self.compactRows = False
         self.outputColumns = [
             "properties.parent_id",
             "properties.id",
@@ -85,15 +224,233 @@ class crawler:
             "systemattributes.Dossiernummer",
         ]
 
+        # Raw responses are written in the background to gzip segments, see `idms.debugwriter.debugWriter` for
+        # sampling and size caps.
         self.debugJson = True
+        self.debugWriter = debugWriter()
 
         # Retry faulty urls, extra fall back when it's not a HTTP code.
         self.maxErrorRetry = maxErrorRetry
 
+        self._columnPlan = None
+
+        # Node id to `parentChain` of its ancestors, filled by `parents` and by search results.
+        self.ancestorsCache = lruCache(10000)
+
+        # Query language clause for a date range shard of `search_parallel`, dates are formatted as YYYYMMDD.
+        self.dateRangeQuery = '[QLREGION {field}] [QLRANGE "{start}~{end}"]'
+
+    def _dumpDebugJson(self, data: dict):
+        """
+        Queue raw response for `self.debugWriter` when `self.debugJson` is enabled.
+        """
+        if self.debugJson:
+            self.debugWriter.write(data)
+
+    def flattenParents(self, listParents: list, lastNode: str = None) -> str:
+        """
+        Function to concat parents to string.
+        listParents: [] (list)
+        lastNode: DocumentName (str)
+        Example: Central > Map 1 > Map 2 > DocumentName
+        """
+        joinedString = " > ".join([a.get("name") for a in listParents])
+        if lastNode:
+            return joinedString + " > " + str(lastNode)
+        else:
+            return joinedString
+
+    def columnPlan(self) -> columnPlan:
+        """
+        Compiled `self.outputColumns`, compiled again when the output columns are changed.
+        """
+        if self._columnPlan is None or self._columnPlan.columns != self.outputColumns:
+            self._columnPlan = columnPlan(self.outputColumns)
+        return self._columnPlan
+
+    def parseNodeColumns(self, dataRow: dict, parents: list = []) -> dict:
+        """
+        Reduce dict to only usefull output columns based on: `self.outputColumns`
+        `parents` is a list of parent entries or a `parentChain`, of which the path string is reused.
+        """
+        properties = (dataRow or {}).get("properties") or {}
+        nodeId = properties.get("id")
+        if self.compactRows:
+            values = [otfunc.mimetype2FileType(properties.get("mime_type"))] + self.columnPlan().values(dataRow)
+            if self.includeParentsPath:
+                values.append(parents.path if isinstance(parents, parentChain) else self.flattenParents(parents))
+            return self.compactRowType()(nodeId, values)
+
+        row = {}
+        row["downloadUrl"] = f"/otcs/llisapi.dll?func=ll&objId={nodeId}&objAction=download"
+        row["viewUrl"] = f"/otcs/llisapi.dll?func=ll&objId={nodeId}&objAction=browse"
+        row["nodeType"] = otfunc.mimetype2FileType(properties.get("mime_type"))
+        self.columnPlan().extract(dataRow, row)
+
+        if self.includeParentsPath:
+            if isinstance(parents, parentChain):
+                row["locationPathString"] = parents.path
+            else:
+                row["locationPathString"] = self.flattenParents(parents)
+
+        return row
+
+    def _parentEntry(self, dataRow: dict) -> dict:
+        """
+        Convert a folder node to an entry for the parents list, same shape as the ancestors API.
+        """
+        properties = (dataRow or {}).get("properties") or {}
+        return {
+            "id": properties.get("id"),
+            "name": properties.get("name"),
+            "parent_id": properties.get("parent_id"),
+            "type": properties.get("type"),
+            "volume_id": properties.get("volume_id"),
+            "type_name": properties.get("type_name"),
+        }
+
+    def parseSearchResult(self, result: dict, complexQuery: str = None) -> dict:
+        """
+        Reduce a single search result to a row, the location path is taken from `links.ancestors` of the result.
+        """
+        if self.compactRows:
+            dataRow = result.get("data")
+            properties = (dataRow or {}).get("properties") or {}
+            values = [otfunc.mimetype2FileType(properties.get("mime_type"))] + self.columnPlan().values(dataRow)
+            values.extend([self._searchResultChain(result).path, complexQuery])
+            return self.compactRowType(search=True)(properties.get("id"), values)
+        row = self.parseNodeColumns(result.get("data"))
+        row["locationPathString"] = self._searchResultChain(result).path
+        row["complexQuery"] = complexQuery
+        return row
+
+    def compactRowType(self, search: bool = False) -> type:
+        """
+        `idms.rows.compactRow` class with the columns of a crawl row, or of a search row with `search`.
+        """
+        columns = ("nodeType",) + tuple(self.outputColumns)
+        if self.includeParentsPath or search:
+            columns = columns + ("locationPathString",)
+        if search:
+            columns = columns + ("complexQuery",)
+        return compactRowType(columns)
+
+    def _searchResultChain(self, result: dict) -> parentChain:
+        """
+        Ancestors of a search result as `parentChain`, shared by all results in the same folder through
+        `ancestorsCache`. The ancestors of a result end with its parent, so they are cached as ancestors of the parent.
+        """
+        parentId = dotfield(result, "data.properties.parent_id")
+        chain = self.ancestorsCache.get(parentId) if parentId else None
+        if chain is None:
+            ancestorsList = dotfield(result, "links.ancestors", []) or []
+            chain = parentChain.fromList(ancestorsList)
+            if parentId and ancestorsList and ancestorsList[-1].get("id") == parentId:
+                self.ancestorsCache.put(parentId, chain)
+        return chain
+
+    def searchRequestData(self, url: str, base_data: dict) -> tuple:
+        """
+        Split a (next page) search url into the url to post to and the form data including the url parameters.
+        """
+        data = base_data.copy()
+        if "?" in url:
+            post_url, params = url.split("?")
+
+            # Split the query string on the '&' character
+            query_params = params.split("&")
+
+            # Loop through each key-value pair and add it to the dictionary
+            for param in query_params:
+                key, value = param.split("=")
+                data[key] = value
+        else:
+            post_url = url
+        return post_url, data
+
+
+class crawler(baseCrawler):
+    def __init__(
+        self,
+        baseUrl: str,
+        username: str = None,
+        password: str = None,
+        ticket: str = None,
+        verifySSL: bool = True,
+        maxErrorRetry: int = 10,
+        post_error_retries: int = 10,
+        maxRequestsInFlight: int = 8,
+        ticketCache: str = None,
+        idleTimeout: float = 25 * 60,
+    ):
+        # Settings for retry and auto retry if error code 500 is given
+        retry = Retry(
+            total=post_error_retries,
+            read=post_error_retries,
+            connect=post_error_retries,
+            backoff_factor=1,
+            status_forcelist=(500, 502, 503, 504),
+        )
+
+        super().__init__(baseUrl, maxErrorRetry)
+
+        # Mounts a session for re-use authorization
+        self.session = requests.Session()
+        self.session.verify = verifySSL
+        self.session.mount(baseUrl, HTTPAdapter(max_retries=retry, pool_maxsize=maxRequestsInFlight))
+
+        # Global cap on concurrent requests, shared by every thread that uses this crawler.
+        self.maxRequestsInFlight = maxRequestsInFlight
+        self._inFlight = threading.BoundedSemaphore(maxRequestsInFlight)
+
+        # Optional `idms.nodestore.nodeStore` to keep crawled nodes for incremental crawls.
+        self.nodeStore = None
+
+        # Optional `idms.journal.crawlJournal` to resume crawls, searches use a journal in the working directory
+        # when none is set.
+        self.journal = None
+        self._searchJournal = None
+        self._searchJournalLock = threading.Lock()
+
+        # Optional `idms.cache.searchCache` to serve repeated search pages without a request.
+        self.searchCache = None
+
+        # Folders waiting in a breadth first crawl above this number are spilled to files in frontierDirectory
+        # (default: the temp directory).
+        self.frontierMemoryLimit = 10000
+        self.frontierDirectory = None
+
+        # The next page of a folder or search is fetched in the background while a page is processed.
+        self.prefetch = True
+        self._prefetchPool = None
+        self._prefetchLock = threading.Lock()
+
+        # Page sizes tuned from the observed latency and payload per row, see `idms.pagesize.adaptivePageSize`.
+        # Set `childrenPageSize` to None for fixed pages of 100 children, searches with a `limit` use that limit.
+        self.childrenPageSize = adaptivePageSize()
+        self.searchPageSize = adaptivePageSize(initial=50)
+
+        # Tickets are shared by all threads, refreshed on a 401 or when idle for `idleTimeout` seconds (set it below
+        # the session timeout of the server), and with `ticketCache` (a file path) reused by other processes, see
+        # `idms.tickets.ticketManager`.
+        self.tickets = ticketManager(
+            (lambda: self.authorize(username, password)) if username else None,
+            cachePath=ticketCache,
+            cacheKey=f"{baseUrl}|{username}",
+            idleTimeout=idleTimeout,
+        )
         if ticket:
-            self.ticket = ticket
+            self.tickets.set(ticket)
         else:
-            self.ticket = self.authorize(username, password)
+            self.tickets.get()
+
+    @property
+    def ticket(self) -> str:
+        return self.tickets.get()
+
+    @ticket.setter
+    def ticket(self, ticket: str):
+        self.tickets.set(ticket)
 
     def authorize(self, username: str, password: str) -> str:
         """
@@ -101,7 +458,7 @@ class crawler:
         """
         url = self.baseUrl + "/api/v1/auth"
         body = {"username": username, "password": password}
-        response = self.session.post(url, data=body)
+        response = self._request("POST", url, data=body)
         try:
             r = response.json()
             error = r.get("error")
@@ -114,226 +471,1154 @@ class crawler:
             print(response)
             raise Exception("Username or password not correct!")
 
-    def flattenParents(self, listParents: list, lastNode: str = None) -> str:
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
         """
-        Function to concat parents to string.
-        listParents: [] (list)
-        lastNode: DocumentName (str)
-        Example: Central > Map 1 > Map 2 > DocumentName
+        Send a request over the shared session, paced by `self.rateLimiter` and waits while `maxRequestsInFlight`
+        requests are already running. A streamed response (`stream=True`) keeps its place until it is closed, so the
+        body counts too. A 429 (too many requests) is retried up to `maxErrorRetry` times, without rate limiter after
+        its `Retry-After` or 2, 4, 8... seconds (at most a minute). A 401 is retried with a refreshed ticket, a second
+        time when the first was taken from the `ticketCache` of another process and is rejected too.
         """
-        joinedString = " > ".join([a.get("name") for a in listParents])
-        if lastNode:
-            return joinedString + " > " + str(lastNode)
+        kwargs.setdefault("timeout", 60 * 30)
+        attempt = 0
+        reauthorized = 0
+        while True:
+            if self.rateLimiter is not None:
+                self.rateLimiter.acquire()
+            self._inFlight.acquire()
+            start = time.monotonic()
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except Exception:
+                self._inFlight.release()
+                if self.rateLimiter is not None:
+                    self.rateLimiter.record(time.monotonic() - start)
+                if self.metrics is not None:
+                    latency = time.monotonic() - start
+                    self.metrics.recordRequest(method, url, None, latency, retries=int(attempt > 0))
+                raise
+            if kwargs.get("stream"):
+                self._releaseOnClose(r)
+            else:
+                self._inFlight.release()
+            latency = time.monotonic() - start
+            if self.rateLimiter is not None:
+                self.rateLimiter.record(latency, r.status_code, retryAfter(r.headers))
+            if self.metrics is not None:
+                self._recordRequest(method, url, r, latency, attempt, kwargs.get("stream"))
+            if r.status_code == 429 and attempt < self.maxErrorRetry:
+                attempt = attempt + 1
+                logging.debug(f"Too many requests, retry {attempt} for {url}")
+                r.close()
+                if self.rateLimiter is None:
+                    # The rate limiter waits for Retry-After itself.
+                    wait = retryAfter(r.headers)
+                    time.sleep(min(2**attempt, 60) if wait is None else wait)
+                continue
+            headers = kwargs.get("headers") or {}
+            if r.status_code == 401 and "otcsticket" in headers and reauthorized < 2:
+                logging.debug(f"Ticket rejected, retry with a new ticket for {url}")
+                ticket = self.tickets.refresh(headers["otcsticket"])
+                if ticket == headers["otcsticket"]:
+                    return r
+                r.close()
+                kwargs["headers"] = dict(headers, otcsticket=ticket)
+                reauthorized = reauthorized + 1
+                continue
+            # The server renews the ticket on use.
+            if r.headers.get("OTCSTicket"):
+                self.tickets.set(r.headers["OTCSTicket"])
+            return r
+
+    def _releaseOnClose(self, r: requests.Response):
+        """
+        Release the in-flight place of a streamed response when it is closed (once, also when closed twice).
+        """
+        close = r.close
+        released = threading.Lock()
+
+        def closeAndRelease():
+            try:
+                close()
+            finally:
+                if released.acquire(blocking=False):
+                    self._inFlight.release()
+
+        r.close = closeAndRelease
+
+    def _prefetch(self, function, *args) -> Future:
+        """
+        Run `function` in the background on the prefetch pool (`maxRequestsInFlight` threads).
+        """
+        if self._prefetchPool is None:
+            with self._prefetchLock:
+                if self._prefetchPool is None:
+                    self._prefetchPool = ThreadPoolExecutor(
+                        self.maxRequestsInFlight, thread_name_prefix="idms-prefetch"
+                    )
+        return self._prefetchPool.submit(function, *args)
+
+    def _recordRequest(self, method: str, url: str, r: requests.Response, latency: float, attempt: int, stream: bool):
+        """
+        Add a response to `self.metrics`, with the retries of the `Retry` adapter and of a 429 before it.
+        """
+        history = getattr(getattr(r.raw, "retries", None), "history", None) or ()
+        body = r.request.body if r.request is not None else None
+        if stream:
+            responseBytes = int(r.headers.get("Content-Length") or 0)
         else:
-            return joinedString
+            responseBytes = len(r.content)
+        self.metrics.recordRequest(
+            method,
+            url,
+            r.status_code,
+            latency,
+            len(body or b""),
+            responseBytes,
+            len(history) + int(attempt > 0),
+        )
 
     def parents(self, nodeId: str) -> list:
         """
         Recursive function to craw all parents of node.
         """
+        return list(self.ancestorChain(nodeId))
+
+    def ancestorChain(self, nodeId: str) -> parentChain:
+        """
+        Ancestors of node as `parentChain`, repeated lookups are served from `ancestorsCache`.
+        """
+        chain = self.ancestorsCache.get(int(nodeId))
+        if chain is not None:
+            return chain
+
         headers = {"otcsticket": self.ticket}
 
         url = self.baseUrl + f"/api/v1/nodes/{nodeId}/ancestors"
         logging.debug(f"url: {url}")
         logging.debug(headers)
-        r = self.session.get(url, headers=headers, timeout=60 * 30)
+        r = self._request("GET", url, headers=headers)
         r.raise_for_status()
         data = r.json()
-        return data.get("ancestors", [])
+        chain = parentChain.fromList(data.get("ancestors", []))
+        self.ancestorsCache.put(int(nodeId), chain)
+        return chain
 
-    def parseNodeColumns(self, dataRow: dict, parents: list = []) -> dict:
+    def _fetchChildrenPage(self, nodeId: str, page: int, limit: int = 100, sort: str = None) -> dict:
         """
-        Reduce dict to only usefull output columns based on: `self.outputColumns`
+        Fetch a single page of children of a node, optionally sorted (for example `desc_modify_date`).
         """
-        row = {}
+        headers = {"otcsticket": self.ticket}
+        url = self.baseUrl + f"/api/v2/nodes/{nodeId}/nodes?limit={limit}&page={page}"
+        if sort:
+            url = url + f"&sort={sort}"
+        logging.debug(f"url: {url}")
+        logging.debug(headers)
+        r = self._request("GET", url, headers=headers)
+        r.raise_for_status()
+        data = r.json()
+        self._dumpDebugJson(data)
+        if self.childrenPageSize is not None:
+            self.childrenPageSize.record(len(data.get("results", [])), r.elapsed.total_seconds(), len(r.content))
+        if self.metrics is not None:
+            self.metrics.recordPage(len(data.get("results", [])), nodeId)
+        return data
 
-        nodeId = dotfield(dataRow, "properties.id")
-        row["downloadUrl"] = f"/otcs/llisapi.dll?func=ll&objId={nodeId}&objAction=download"
-        row["viewUrl"] = f"/otcs/llisapi.dll?func=ll&objId={nodeId}&objAction=browse"
-        row["nodeType"] = otfunc.mimetype2FileType(dotfield(dataRow, "properties.mime_type"))
-        for colName in self.outputColumns:
-            row[colName] = dotfield(dataRow, colName)
+    def iter_children(
+        self,
+        nodeId: str,
+        parents: list = None,
+        stopRecursive: bool = False,
+        incremental: bool = False,
+        crawlId: str = None,
+        order: str = "dfs",
+        maxDepth: int = None,
+        maxNodes: int = None,
+    ):
+        """
+        Generator to craw children of node, yields each row as soon as its page is fetched.
 
-        if self.includeParentsPath:
-            row["locationPathString"] = self.flattenParents(parents)
+        order: "dfs" (default) crawls depth first, the rows of a subfolder are yielded before the row of the
+        subfolder itself. "bfs" crawls breadth first, all rows of a level are yielded before the next level, the
+        folders waiting to be crawled are spilled to disk above `frontierMemoryLimit` (see `idms.frontier`).
+        maxDepth: number of folder levels below node to crawl, 1 gives only the direct children.
+        maxNodes: stop after this number of rows.
 
-        return row
+        The children of a folder are fetched once per crawl, a folder that is reached again is yielded as row but
+        not crawled again (see `self.visited` to share this between crawls with overlapping start nodes).
+
+        When `self.nodeStore` is set all fetched nodes are stored. With `incremental` a subfolder whose
+        `modify_date` did not change since it was stored is not fetched, its rows (and those of its subfolders)
+        are served from the store.
 
-    def children(self, nodeId: str, parents: list = None, stopRecursive: bool = False) -> list:
+        When `self.journal` is set (see `idms.journal.crawlJournal`) the progress is kept under `crawlId`
+        (default: children:<nodeId>). Running the same crawl again after it stopped (or reached `maxNodes`)
+        continues after the last yielded row, done folders are not fetched again.
         """
-        Recursive function to craw children of node.
+        if incremental and self.nodeStore is None:
+            raise Exception("Incremental crawl needs a nodeStore, set `crawler.nodeStore` first!")
+        if order not in ("dfs", "bfs"):
+            raise Exception(f"Unknown crawl order {order}, use 'dfs' or 'bfs'!")
+        if not parents and self.includeParentsPath:
+            parents = self.ancestorChain(nodeId)
+        elif not isinstance(parents, parentChain):
+            parents = parentChain.fromList(parents)
+
+        visited = self.visited if self.visited is not None else visitedSet()
+        duplicates = visited.duplicates
+        if not visited.add(nodeId):
+            logging.info(f"Folder {nodeId} is already crawled.")
+            return
+
+        root = {"id": nodeId, "parents": parents, "stopRecursive": stopRecursive, "modifyDate": None, "depth": 1}
+        crawl = self._crawlDepthFirst if order == "dfs" else self._crawlBreadthFirst
+        if self.journal is None:
+            yield from crawl(root, incremental, None, maxDepth, maxNodes, visited)
+        else:
+            crawlId = crawlId or f"children:{nodeId}"
+            self.journal.startCrawl(crawlId)
+            try:
+                truncated = yield from crawl(root, incremental, crawlId, maxDepth, maxNodes, visited)
+            finally:
+                self.journal.commit()
+            if not truncated:
+                self.journal.finishCrawl(crawlId)
+        if visited.duplicates > duplicates:
+            logging.info(f"Avoided {visited.duplicates - duplicates} duplicate folder fetches.")
+
+    def _folderPages(
+        self,
+        nodeId: str,
+        parents: parentChain,
+        modifyDate: str = None,
+        incremental: bool = False,
+        startPage: int = 1,
+        adaptive: bool = True,
+    ):
         """
-        headers = {"otcsticket": self.ticket}
+        Generator of (page, list of raw nodes) of the children of a folder from `startPage` on, fetched from the
+        server or with `incremental` served from `self.nodeStore` when the folder did not change.
+        With `adaptive` the page size follows `childrenPageSize`, else (and when resuming) pages of 100 are used.
+        """
+        store = self.nodeStore
+        if incremental and startPage == 1 and store.isUnchanged(nodeId, modifyDate):
+            logging.debug(f"Folder {nodeId} unchanged since {modifyDate}, served from nodeStore")
+            yield 1, store.children(nodeId)
+            return
+        if store is not None and startPage == 1:
+            store.beginFolder(nodeId, modifyDate, parents)
 
-        if not parents and self.includeParentsPath:
-            parents = self.parents(nodeId)
-        page = 1
+        page = startPage
         counter = 1
         limit = 100
-        page_total = 9999999999999
-        results = []
-        while page <= page_total and counter < self.maxCallsPerFolder:
-            counter = counter + 1
-            url = self.baseUrl + f"/api/v2/nodes/{nodeId}/nodes?limit={limit}&page={page}"
-            logging.debug(f"url: {url}")
-            logging.debug(headers)
-            r = self.session.get(url, headers=headers, timeout=60 * 30)
-            r.raise_for_status()
-            page = page + 1
-            data = r.json()
-            if self.debugJson:
-                yyyymmddhhmmss = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
-                with open(f"debug_{yyyymmddhhmmss}.json", "w") as f:
-                    json.dump(data, f)
-
-            page_total = dotfield(data, "collection.paging.page_total", 0)
-            for result in data.get("results", []):
-                dataRow = result.get("data")
-
-                # Check if a node is a folder type. Some folder types are collections of other nodes
-                # the risk of recursive call a collection is that it can end in an infinity loop.
-                # folderTypesStopRecursive is a list of collectiontypes and children will be fetched.
-                # If there are also subfolders in that collection it won't fetch further.
-                if dotfield(dataRow, "properties.type") in self.folderTypes and stopRecursive == False:
-                    time.sleep(self.gracefulSleepSeconds)
-                    # Recursive call
-                    newParents = copy.deepcopy(parents)
-                    newParents.append(
-                        {
-                            "id": dotfield(dataRow, "properties.id"),
-                            "name": dotfield(dataRow, "properties.name"),
-                            "parent_id": dotfield(dataRow, "properties.parent_id"),
-                            "type": dotfield(dataRow, "properties.type"),
-                            "volume_id": dotfield(dataRow, "properties.volume_id"),
-                            "type_name": dotfield(dataRow, "properties.type_name"),
-                        }
-                    )
-                    if dotfield(dataRow, "properties.type") in self.folderTypesStopRecursive:
-                        stopRecursive = True
-                    else:
-                        stopRecursive = False
-                    childs = self.children(dotfield(dataRow, "properties.id"), newParents, stopRecursive)
-                    results = results + childs
-
-                row = self.parseNodeColumns(dataRow, parents)
+        tuner = self.childrenPageSize if adaptive and startPage == 1 else None
+        if tuner is not None:
+            limit = tuner.size()
+        fetchSeconds = 0.0
+        pages = 0
+        rows = 0
+        more = True
+        prefetched = None
+        try:
+            while more and counter < self.maxCallsPerFolder:
+                counter = counter + 1
+                start = time.monotonic()
+                if prefetched is not None:
+                    data = prefetched.result()
+                    prefetched = None
+                else:
+                    data = self._fetchChildrenPage(nodeId, page, limit)
+                fetchSeconds = fetchSeconds + time.monotonic() - start
+                dataRows = [result.get("data") for result in data.get("results", [])]
+                pages = pages + 1
+                rows = rows + len(dataRows)
+                if store is not None:
+                    store.putPage(nodeId, dataRows, (page - 1) * limit)
 
-                results.append(row)
+                current = page
+                more = page < (dotfield(data, "collection.paging.page_total", 0) or 0)
+                if more:
+                    if tuner is not None:
+                        page, limit = adaptivePageSize.nextPage(page, limit, tuner.size())
+                    else:
+                        page = page + 1
+                    # Fetch the next page while the rows of this page are processed.
+                    if self.prefetch:
+                        prefetched = self._prefetch(self._fetchChildrenPage, nodeId, page, limit)
+                yield current, dataRows
+        finally:
+            if prefetched is not None:
+                prefetched.cancel()
 
-        if counter >= self.maxCallsPerFolder:
+        if more:
             raise Exception(
                 f"Stopped due counter ({counter}) reached the maxCallsPerFolder ({self.maxCallsPerFolder}) limit!"
             )
+        if store is not None:
+            store.endFolder(nodeId)
+        if self.metrics is not None:
+            self.metrics.recordFolder(nodeId, fetchSeconds, pages, rows)
+
+    def _startFolder(self, task: dict, crawlId: str) -> tuple:
+        """
+        (page, position) to start crawling a folder at, None when the journal has the folder as done.
+        """
+        journal = self.journal if crawlId else None
+        if journal is None:
+            return 1, 0
+        state = journal.folderState(crawlId, task["id"])
+        if state is None:
+            journal.startFolder(
+                crawlId, task["id"], task["parents"], task["depth"], task["stopRecursive"], task["modifyDate"]
+            )
+            return 1, 0
+        if state["status"] == "done":
+            return None
+        return state["page"], state["position"]
+
+    def _subfolderTask(self, task: dict, dataRow: dict, maxDepth: int = None, visited: visitedSet = None) -> dict:
+        """
+        Frontier task to crawl the children of a row of folder `task`, None if the row is not crawled further.
+        """
+        properties = (dataRow or {}).get("properties") or {}
+        nodeType = properties.get("type")
+        # Subfolders of a collection (folderTypesStopRecursive) are not crawled, the visited set prevents
+        # fetching a folder twice and endless loops through collections that contain their own ancestors.
+        if nodeType not in self.folderTypes or task["stopRecursive"]:
+            return None
+        if maxDepth is not None and task["depth"] >= maxDepth:
+            return None
+        if visited is not None and not visited.add(properties.get("id")):
+            logging.debug(f"Folder {properties.get('id')} is already crawled.")
+            return None
+        time.sleep(self.gracefulSleepSeconds)
+        return {
+            "id": properties.get("id"),
+            "parents": task["parents"].append(self._parentEntry(dataRow)),
+            "stopRecursive": nodeType in self.folderTypesStopRecursive,
+            "modifyDate": properties.get("modify_date"),
+            "depth": task["depth"] + 1,
+        }
 
+    def _folderFrame(self, task: dict, incremental: bool, crawlId: str) -> dict:
+        start = self._startFolder(task, crawlId)
+        if start is None:
+            return None
+        pages = self._folderPages(
+            task["id"], task["parents"], task["modifyDate"], incremental, start[0], adaptive=crawlId is None
+        )
+        return {"task": task, "pages": pages, "start": start, "page": None, "rows": [], "index": 0, "descended": False}
+
+    def _crawlDepthFirst(
+        self, root: dict, incremental: bool, crawlId: str, maxDepth: int, maxNodes: int, visited: visitedSet = None
+    ):
+        """
+        Depth first crawl with an explicit stack of folders (one page per folder in memory), rows of a subfolder
+        are yielded before the row of the subfolder. Returns True when stopped at `maxNodes`.
+        """
+        journal = self.journal if crawlId else None
+        count = 0
+        stack = []
+        frame = self._folderFrame(root, incremental, crawlId)
+        if frame is not None:
+            stack.append(frame)
+        while stack:
+            frame = stack[-1]
+            task = frame["task"]
+            if frame["descended"]:
+                # Back from the subfolder, its own row is next.
+                frame["descended"] = False
+            elif frame["index"] < len(frame["rows"]):
+                subfolder = self._subfolderTask(task, frame["rows"][frame["index"]], maxDepth, visited)
+                if subfolder is not None:
+                    frame["descended"] = True
+                    subframe = self._folderFrame(subfolder, incremental, crawlId)
+                    if subframe is not None:
+                        stack.append(subframe)
+                    continue
+            else:
+                if journal is not None and frame["page"] is not None:
+                    journal.savePosition(crawlId, task["id"], frame["page"] + 1, 0)
+                try:
+                    page, dataRows = next(frame["pages"])
+                except StopIteration:
+                    if journal is not None:
+                        journal.finishFolder(crawlId, task["id"])
+                    stack.pop()
+                    continue
+                startPage, startPosition = frame["start"]
+                frame["page"] = page
+                frame["rows"] = dataRows
+                frame["index"] = startPosition if page == startPage else 0
+                continue
+
+            yield self.parseNodeColumns(frame["rows"][frame["index"]], task["parents"])
+            frame["index"] = frame["index"] + 1
+            if journal is not None:
+                journal.savePosition(crawlId, task["id"], frame["page"], frame["index"])
+            count = count + 1
+            if maxNodes is not None and count >= maxNodes:
+                logging.info(f"Stopped crawl after maxNodes ({maxNodes}) rows.")
+                return True
+        return False
+
+    def _crawlBreadthFirst(
+        self, root: dict, incremental: bool, crawlId: str, maxDepth: int, maxNodes: int, visited: visitedSet = None
+    ):
+        """
+        Breadth first crawl, folders waiting to be crawled are kept in a `frontierQueue` that spills to disk.
+        With a journal the queued folders are journaled too, a resumed crawl starts with the pending folders.
+        Returns True when stopped at `maxNodes`.
+        """
+        journal = self.journal if crawlId else None
+        frontier = frontierQueue(self.frontierMemoryLimit, self.frontierDirectory, default=list)
+        pending = journal.pendingFolders(crawlId) if journal is not None else []
+        for folder in pending:
+            frontier.push(
+                {
+                    "id": folder["id"],
+                    "parents": folder["parents"],
+                    "stopRecursive": folder["stopRecursive"],
+                    "modifyDate": folder["modifyDate"],
+                    "depth": folder["depth"],
+                }
+            )
+        if not pending:
+            frontier.push(root)
+
+        count = 0
+        try:
+            while frontier:
+                task = frontier.pop()
+                if not isinstance(task["parents"], parentChain):
+                    task["parents"] = parentChain.fromList(task["parents"])
+                start = self._startFolder(task, crawlId)
+                if start is None:
+                    continue
+                startPage, startPosition = start
+                for page, dataRows in self._folderPages(
+                    task["id"], task["parents"], task["modifyDate"], incremental, startPage, adaptive=journal is None
+                ):
+                    for index in range(startPosition if page == startPage else 0, len(dataRows)):
+                        dataRow = dataRows[index]
+                        subfolder = self._subfolderTask(task, dataRow, maxDepth, visited)
+                        if subfolder is not None:
+                            if journal is not None:
+                                journal.startFolder(
+                                    crawlId,
+                                    subfolder["id"],
+                                    subfolder["parents"],
+                                    subfolder["depth"],
+                                    subfolder["stopRecursive"],
+                                    subfolder["modifyDate"],
+                                )
+                            frontier.push(subfolder)
+
+                        yield self.parseNodeColumns(dataRow, task["parents"])
+                        if journal is not None:
+                            journal.savePosition(crawlId, task["id"], page, index + 1)
+                        count = count + 1
+                        if maxNodes is not None and count >= maxNodes:
+                            logging.info(f"Stopped crawl after maxNodes ({maxNodes}) rows.")
+                            return True
+
+                    if journal is not None:
+                        journal.savePosition(crawlId, task["id"], page + 1, 0)
+                if journal is not None:
+                    journal.finishFolder(crawlId, task["id"])
+        finally:
+            frontier.close()
+        return False
+
+    def children(
+        self,
+        nodeId: str,
+        parents: list = None,
+        stopRecursive: bool = False,
+        sink=None,
+        incremental: bool = False,
+        crawlId: str = None,
+        order: str = "dfs",
+        maxDepth: int = None,
+        maxNodes: int = None,
+    ):
+        """
+        Craw children of node, see `iter_children` to stream the rows, for `order`, `maxDepth`, `maxNodes`,
+        `incremental` and for resuming with `crawlId`.
+        With a `sink` (see `idms.sinks`) rows are written to the sink while crawling and the number of rows is returned.
+        """
+        rows = self.iter_children(nodeId, parents, stopRecursive, incremental, crawlId, order, maxDepth, maxNodes)
+        if sink is not None:
+            return sink.writeRows(rows)
+        return list(rows)
+
+    @staticmethod
+    def _newStats(task: dict) -> dict:
+        return {
+            "id": task["id"],
+            "path": task["parents"].path,
+            "depth": task["depth"],
+            "documents": 0,
+            "folders": 0,
+            "bytes": 0,
+            "newest": None,
+            "nodeTypes": {},
+            "uncrawledItems": 0,
+        }
+
+    @staticmethod
+    def _mergeStats(stats: dict, child: dict):
+        """
+        Add the totals of a finished subfolder to the stats of its folder.
+        """
+        for key in ("documents", "folders", "bytes", "uncrawledItems"):
+            stats[key] = stats[key] + child[key]
+        if child["newest"] and (stats["newest"] is None or child["newest"] > stats["newest"]):
+            stats["newest"] = child["newest"]
+        for nodeType, counts in child["nodeTypes"].items():
+            total = stats["nodeTypes"].setdefault(nodeType, {"count": 0, "bytes": 0})
+            total["count"] = total["count"] + counts["count"]
+            total["bytes"] = total["bytes"] + counts["bytes"]
+
+    def subtree_stats(
+        self,
+        nodeId: str,
+        maxDepth: int = None,
+        reportDepth: int = None,
+        skipEmptyFolders: bool = True,
+        incremental: bool = False,
+    ) -> dict:
+        """
+        Statistics of the subtree of every folder without building rows, rolled up bottom-up while the pages stream
+        in: number of documents and folders, total `properties.size` of the documents, newest `modify_date` and per
+        `nodeType` (see `mimetype2FileType`) the count and bytes of the documents. Only the folders on the path from
+        the start node to the current folder have running totals in memory.
+
+        Returns {folder id: stats} for the folders up to `reportDepth` levels (default: all), the start node is
+        depth 1. The server reports the number of items of a folder as its size: with `skipEmptyFolders` folders
+        with 0 items are not fetched, and the items of folders below `maxDepth` or in a collection are counted as
+        `uncrawledItems` without fetching them.
+
+        Example:
+        stats = idms.subtree_stats(startNode, reportDepth=2)
+        stats[startNode] -> {"documents": 1200, "folders": 35, "bytes": 5400000, "newest": "2023-05-01T10:00:00", ...}
+        """
+        if incremental and self.nodeStore is None:
+            raise Exception("Incremental crawl needs a nodeStore, set `crawler.nodeStore` first!")
+        parents = self.ancestorChain(nodeId) if self.includeParentsPath else parentChain()
+        visited = self.visited if self.visited is not None else visitedSet()
+        visited.add(nodeId)
+
+        results = {}
+        root = {"id": nodeId, "parents": parents, "stopRecursive": False, "modifyDate": None, "depth": 1}
+        stack = [{"task": root, "stats": self._newStats(root), "pages": self._folderPages(nodeId, parents), "up": None}]
+        while stack:
+            frame = stack[-1]
+            task, stats = frame["task"], frame["stats"]
+            try:
+                _, dataRows = next(frame["pages"])
+            except StopIteration:
+                stack.pop()
+                if frame["up"] is not None:
+                    self._mergeStats(frame["up"], stats)
+                if reportDepth is None or task["depth"] <= reportDepth:
+                    results[task["id"]] = stats
+                continue
+
+            subfolders = []
+            for dataRow in dataRows:
+                properties = (dataRow or {}).get("properties") or {}
+                modifyDate = properties.get("modify_date")
+                if modifyDate and (stats["newest"] is None or modifyDate > stats["newest"]):
+                    stats["newest"] = modifyDate
+                if properties.get("type") in self.folderTypes:
+                    stats["folders"] = stats["folders"] + 1
+                    items = properties.get("container_size", properties.get("size"))
+                    subfolder = self._subfolderTask(task, dataRow, maxDepth, visited)
+                    if subfolder is not None:
+                        subfolders.append((subfolder, items))
+                    elif task["stopRecursive"] or (maxDepth is not None and task["depth"] >= maxDepth):
+                        stats["uncrawledItems"] = stats["uncrawledItems"] + (items if isinstance(items, int) else 0)
+                    continue
+                size = properties.get("size")
+                size = size if isinstance(size, int) else 0
+                nodeType = otfunc.mimetype2FileType(properties.get("mime_type"))
+                counts = stats["nodeTypes"].setdefault(nodeType, {"count": 0, "bytes": 0})
+                counts["count"] = counts["count"] + 1
+                counts["bytes"] = counts["bytes"] + size
+                stats["documents"] = stats["documents"] + 1
+                stats["bytes"] = stats["bytes"] + size
+
+            # Subfolders of this page are crawled before the next page (pushed in reverse so the first is crawled
+            # first), each adds its totals to the stats of this folder when it is done.
+            for subfolder, items in reversed(subfolders):
+                if skipEmptyFolders and items == 0:
+                    if reportDepth is None or subfolder["depth"] <= reportDepth:
+                        results[subfolder["id"]] = self._newStats(subfolder)
+                    continue
+                pages = self._folderPages(subfolder["id"], subfolder["parents"], subfolder["modifyDate"], incremental)
+                stack.append({"task": subfolder, "stats": self._newStats(subfolder), "pages": pages, "up": stats})
         return results
 
-    def search(
+    def children_concurrent(self, nodeId: str, workers: int = 8, parents: list = None) -> list:
+        """
+        Concurrent variant of `children`, sibling folders and their pages are fetched by a pool of `workers` threads.
+
+        All workers share `self.session` and `self.rateLimiter`, the number of requests in flight is capped by
+        `maxRequestsInFlight`. Rows and their order are the same as `children`, only when a folder is reached more
+        than once the place where its rows are listed can differ.
+        """
+        if not parents and self.includeParentsPath:
+            parents = self.ancestorChain(nodeId)
+        elif not isinstance(parents, parentChain):
+            parents = parentChain.fromList(parents)
+        limit = 100
+
+        visited = self.visited if self.visited is not None else visitedSet()
+        if not visited.add(nodeId):
+            logging.info(f"Folder {nodeId} is already crawled.")
+            return []
+
+        # Folders are keyed by crawl order.
+        folders = [{"nodeId": nodeId, "parents": parents, "stopRecursive": False, "pages": {}}]
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+
+            def submit(key: int, page: int):
+                future = pool.submit(self._fetchChildrenPage, folders[key]["nodeId"], page, limit)
+                pending[future] = (key, page)
+
+            submit(0, 1)
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key, page = pending.pop(future)
+                        data = future.result()
+                        folder = folders[key]
+
+                        if page == 1:
+                            page_total = dotfield(data, "collection.paging.page_total", 0) or 0
+                            if page_total >= self.maxCallsPerFolder:
+                                raise Exception(
+                                    f"Stopped due page_total ({page_total}) reached the maxCallsPerFolder ({self.maxCallsPerFolder}) limit!"
+                                )
+                            for nextPage in range(2, page_total + 1):
+                                submit(key, nextPage)
+
+                        rows = []
+                        for result in data.get("results", []):
+                            dataRow = result.get("data")
+                            childKey = None
+                            nodeType = dotfield(dataRow, "properties.type")
+                            if (
+                                nodeType in self.folderTypes
+                                and not folder["stopRecursive"]
+                                and visited.add(dotfield(dataRow, "properties.id"))
+                            ):
+                                childKey = len(folders)
+                                folders.append(
+                                    {
+                                        "nodeId": dotfield(dataRow, "properties.id"),
+                                        "parents": folder["parents"].append(self._parentEntry(dataRow)),
+                                        "stopRecursive": nodeType in self.folderTypesStopRecursive,
+                                        "pages": {},
+                                    }
+                                )
+                                submit(childKey, 1)
+                            rows.append((self.parseNodeColumns(dataRow, folder["parents"]), childKey))
+                        folder["pages"][page] = rows
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        # Put rows in the same order as the depth first `children`: subfolder contents before the subfolder row.
+        results = []
+        stack = [self._folderRows(folders[0])]
+        while stack:
+            for row, childKey in stack[-1]:
+                if childKey is not None:
+                    stack.append(iter([(row, None)]))
+                    stack.append(self._folderRows(folders[childKey]))
+                    break
+                results.append(row)
+            else:
+                stack.pop()
+        return results
+
+    @staticmethod
+    def _folderRows(folder: dict):
+        """
+        Iterate over the (row, childKey) tuples of a crawled folder in page order.
+        """
+        for page in sorted(folder["pages"]):
+            yield from folder["pages"][page]
+
+    def download(
+        self,
+        items: list,
+        directory: str,
+        workers: int = 8,
+        chunkSize: int = 1024 * 1024,
+        fileName=None,
+    ) -> list:
+        """
+        Download the content of documents to `directory` with a pool of `workers` threads, each file is streamed to
+        disk in chunks of `chunkSize` bytes. `items` are rows of `children` or `search`, raw nodes or node ids.
+
+        A file whose size matches `properties.size` is skipped, an interrupted download is kept as <file>.part and
+        resumed with a range request. The records (id, path, size, sha256, status) are appended to
+        download_manifest.jsonl in `directory`. Status is downloaded, resumed, skipped, folder or error.
+
+        fileName: function of an item to the file path relative to `directory`, default: <id>_<name>.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = downloadManifest(os.path.join(directory, "download_manifest.jsonl"))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(self._downloadItem, item, directory, chunkSize, fileName, manifest) for item in items
+                ]
+                return [future.result() for future in futures]
+        finally:
+            manifest.close()
+
+    def _downloadItem(self, item, directory: str, chunkSize: int, fileName, manifest: downloadManifest) -> dict:
+        if isinstance(item, Mapping):
+            # A row has dotted column names, a raw node nested properties.
+            get = item.get if "properties.id" in item else lambda key: dotfield(item, key)
+            nodeId, name, size, nodeType = (get(f"properties.{key}") for key in ("id", "name", "size", "type"))
+        else:
+            nodeId, name, size, nodeType = item, None, None, None
+        name = safeFileName(name)
+        path = os.path.join(directory, fileName(item) if fileName else f"{nodeId}_{name}" if name else str(nodeId))
+        record = {"id": nodeId, "path": path, "size": size, "sha256": None}
+
+        if nodeType in self.folderTypes:
+            return dict(record, status="folder")
+        try:
+            if size is not None and os.path.exists(path) and os.path.getsize(path) == size:
+                known = manifest.get(nodeId)
+                if known and known.get("path") == path and known.get("size") == size and known.get("sha256"):
+                    return dict(record, sha256=known["sha256"], status="skipped")
+                record.update(sha256=fileChecksum(path, chunkSize), status="skipped")
+            else:
+                record.update(self._downloadContent(nodeId, path, size, chunkSize))
+        except Exception as e:
+            logging.warning(f"Download of node {nodeId} failed: {e}")
+            return dict(record, status="error", error=str(e))
+        manifest.add(record)
+        return record
+
+    def _downloadContent(self, nodeId, path: str, size: int, chunkSize: int) -> dict:
+        """
+        Stream the content of a node to `path`, continues a <path>.part file of an earlier download.
+        """
+        part = path + ".part"
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if size is not None and offset >= size:
+            offset = 0
+        headers = {"otcsticket": self.ticket}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        url = self.baseUrl + f"/api/v2/nodes/{nodeId}/content"
+        logging.debug(f"url: {url}")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        r = self._request("GET", url, headers=headers, stream=True)
+        with r:
+            r.raise_for_status()
+            # Without a partial content response the server sends the whole file.
+            if r.status_code != 206:
+                offset = 0
+            digest = hashlib.sha256()
+            if offset:
+                with open(part, "rb") as f:
+                    for chunk in iter(lambda: f.read(chunkSize), b""):
+                        digest.update(chunk)
+            with open(part, "ab" if offset else "wb") as f:
+                for chunk in r.iter_content(chunkSize):
+                    f.write(chunk)
+                    digest.update(chunk)
+
+        written = os.path.getsize(part)
+        if size is not None and written != size:
+            raise Exception(f"Downloaded {written} of {size} bytes!")
+        os.replace(part, path)
+        return {"size": written, "sha256": digest.hexdigest(), "status": "resumed" if offset else "downloaded"}
+
+    def searchJournal(self) -> crawlJournal:
+        """
+        Journal for search positions: `self.journal`, or else idms_journal.sqlite in the working directory.
+        """
+        if self.journal is not None:
+            return self.journal
+        if self._searchJournal is None:
+            with self._searchJournalLock:
+                if self._searchJournal is None:
+                    self._searchJournal = crawlJournal(os.path.join(os.getcwd(), "idms_journal.sqlite"))
+        return self._searchJournal
+
+    def _postSearch(self, url: str, base_data: dict) -> dict:
+        """
+        Post a single search page, `url` is the search endpoint or a next page url.
+        """
+        # Query Content Server API to search for params
+        post_url, data = self.searchRequestData(url, base_data)
+        logging.debug(data)
+        cache = self.searchCache
+        key = cache.key(post_url, data) if cache is not None else None
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            return cached
+        headers = {"otcsticket": self.ticket}
+        r = self._request("POST", post_url, headers=headers, data=data)
+        r.raise_for_status()
+        search_results = r.json()
+        self._dumpDebugJson(search_results)
+        if cache is not None:
+            cache.put(key, search_results)
+        if self.searchPageSize is not None:
+            rows = len(search_results.get("results", []))
+            self.searchPageSize.record(rows, r.elapsed.total_seconds(), len(r.content))
+        return search_results
+
+    @staticmethod
+    def _resizeSearchUrl(nextUrl: str, newLimit: int) -> str:
+        """
+        Next page url with page size `newLimit` when the rows so far fill whole pages of it.
+        """
+        path, _, query = nextUrl.partition("?")
+        params = dict(param.split("=", 1) for param in query.split("&") if "=" in param)
+        if not params.get("limit", "").isdigit() or not params.get("page", "").isdigit():
+            return nextUrl
+        page, limit = adaptivePageSize.nextPage(int(params["page"]) - 1, int(params["limit"]), newLimit)
+        params["page"], params["limit"] = str(page), str(limit)
+        return path + "?" + "&".join(f"{key}={value}" for key, value in params.items())
+
+    def iter_search(
         self,
         complexQuery: str,
-        limit: int = 10,
+        limit: int = None,
         metadata: str = "true",
         slice: str = None,
         resume_last_position=True,
         query_id: int = 0,
-    ) -> list:
+        by_page: bool = False,
+    ):
         """
-        Search API endpoint
+        Search API endpoint as generator, yields each row (or a list of rows per page with `by_page`) as soon as
+        the page is fetched. The resume position is kept in the journal (see `searchJournal`) after the rows of a
+        page are consumed, per `query_id` and search parameters. A search that stopped early continues at that
+        position when `resume_last_position` is set, a finished search starts at the first page again.
+        `limit` is the number of rows per page, by default the page size is tuned with `searchPageSize` (10 rows when
+        that is None or a `searchCache` is set).
+        The next page is fetched in the background while a page is processed (see `prefetch`).
         Example: {self.baseUrl}/api/v2/search?where=`complexQuery`&limit=`limit`&metadata=`metadata`
 
         :param str `complexQuery`:  See documentation for search options for a complexQuery: https://docs2.cer-rec.gc.ca/ll-eng/llisapi.dll?func=help.index&keyword=LL.Search%20Broker.Category
         """
 
-        file_path_resume = os.getcwd() + "/" + f"{query_id}_last_position.txt"
+        journal = self.searchJournal()
+        searchKey = json.dumps([query_id, complexQuery, limit, metadata, slice])
 
-        results = np.array([])
-        headers = {"otcsticket": self.ticket}
         counter = 0
 
-        if os.path.exists(file_path_resume) and resume_last_position is True:
-            with open(file_path_resume, "r") as file:
-                url = file.read()
-        else:
+        url = journal.searchPosition(searchKey) if resume_last_position is True else None
+        if not url:
             url = self.baseUrl + "/api/v2/search"
 
         max_error_retries = 0
 
-        base_data = {"where": complexQuery, "limit": limit, "metadata": metadata}
+        # Cached pages are keyed by their page size, so with a `searchCache` pages have a fixed size.
+        tuner = self.searchPageSize if limit is None and self.searchCache is None else None
+        base_data = {"where": complexQuery, "limit": tuner.size() if tuner else limit or 10, "metadata": metadata}
         if slice:
             base_data["slice"] = slice
 
-        # Retrieve all pages of certain search query using a while loop with security of maxCallsPerFolder variable.
-        while url != "" and counter < self.maxCallsPerFolder and max_error_retries < self.maxErrorRetry:
-            try:
-                counter = counter + 1
-                data = base_data.copy()
-                # Query Content Server API to search for params
-                if "?" in url:
-                    post_url, params = url.split("?")
-
-                    # Split the query string on the '&' character
-                    query_params = params.split("&")
-
-                    # Loop through each key-value pair and add it to the dictionary
-                    for param in query_params:
-                        key, value = param.split("=")
-                        data[key] = value
-                else:
-                    post_url = url
-
-                logging.debug(data)
-
-                # The post might sometimes fail thus stop the whole process, i have added a retry if the post fails to try again, this seems to work
-                r = self.session.post(post_url, headers=headers, timeout=60 * 30, data=data)
-                r.raise_for_status()
-                search_results = r.json()
-
-                if self.debugJson:
-                    yyyymmddhhmmss = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
-                    with open(f"debug_{yyyymmddhhmmss}.json", "w") as f:
-                        json.dump(search_results, f)
+        prefetched = None
+        try:
+            # Retrieve all pages of certain search query using a while loop with security of maxCallsPerFolder variable.
+            while url != "" and counter < self.maxCallsPerFolder and max_error_retries < self.maxErrorRetry:
+                try:
+                    counter = counter + 1
+                    # The post might sometimes fail thus stop the whole process, i have added a retry if the post fails to try again, this seems to work
+                    if prefetched is not None and prefetched[0] == url:
+                        future, prefetched = prefetched[1], None
+                        search_results = future.result()
+                    else:
+                        search_results = self._postSearch(url, base_data)
 
-                # Extract only relevant columns from search results
-                for result in search_results.get("results", []):
-                    dataRow = result.get("data")
-                    row = self.parseNodeColumns(dataRow)
+                    # Determine if there is a next page and prepare for next while-loop.
+                    # nextUrl contains a GET url to retrieve the next page.
+                    nextUrl = dotfield(search_results, "collection.paging.links.next.href")
+                    if nextUrl and tuner is not None:
+                        nextUrl = self._resizeSearchUrl(nextUrl, tuner.size())
+                    logging.debug(f" > nextUrl: {nextUrl}")
+                    if nextUrl and self.prefetch:
+                        nextPage = self.baseUrl + nextUrl
+                        prefetched = (nextPage, self._prefetch(self._postSearch, nextPage, base_data))
 
-                    ancestorsList = dotfield(result, "links.ancestors", [])
-                    ancestorsStr = " > ".join([a.get("name") for a in ancestorsList])
-                    row["locationPathString"] = ancestorsStr
-                    row["complexQuery"] = complexQuery
-                    results = np.append(results, row)
+                    # Extract only relevant columns from search results
+                    results = search_results.get("results", [])
+                    rows = [self.parseSearchResult(result, complexQuery) for result in results]
+                    if self.metrics is not None:
+                        self.metrics.recordPage(len(rows))
 
-                # Determine if there is a next page and prepare for next while-loop.
-                # nextUrl contains a GET url to retrieve the next page.
-                nextUrl = dotfield(search_results, "collection.paging.links.next.href")
+                except Exception as e:
+                    max_error_retries = max_error_retries + 1
+                    print(e)
+                    logging.debug("Error: " + str(e))
+                    continue
 
-                logging.debug(f" > nextUrl: {nextUrl}")
+                if by_page:
+                    yield rows
+                else:
+                    yield from rows
 
                 if nextUrl:
                     url = self.baseUrl + nextUrl
-                    with open(file_path_resume, "w") as file:
-                        file.write(str(url))
+                    journal.saveSearchPosition(searchKey, url)
                 else:
                     url = ""
-
-            except Exception as e:
-                max_error_retries = max_error_retries + 1
-                print(e)
-                logging.debug("Error: " + str(e))
+                    journal.finishSearch(searchKey)
+        finally:
+            if prefetched is not None:
+                prefetched[1].cancel()
 
         # Inform the user that the max error retries has been met.
         if max_error_retries >= self.maxErrorRetry:
             logging.warning(
                 f"Stopped due max error tries: ({max_error_retries}) reached the max error retry ({self.maxErrorRetry}) limit!"
             )
-            with open(file_path_resume, "w") as file:
-                file.write(str(url))
+            journal.saveSearchPosition(searchKey, url)
 
         # Inform user if stopped earlier due maxCallsPerFolder variable
         if counter >= self.maxCallsPerFolder:
             logging.warning(
                 f"Stopped due counter ({counter}) reached the maxCallsPerFolder ({self.maxCallsPerFolder}) limit!"
             )
-            with open(file_path_resume, "w") as file:
-                file.write(str(url))
+            journal.saveSearchPosition(searchKey, url)
+
+    def search(
+        self,
+        complexQuery: str,
+        limit: int = None,
+        metadata: str = "true",
+        slice: str = None,
+        resume_last_position=True,
+        query_id: int = 0,
+        sink=None,
+    ):
+        """
+        Search API endpoint, returns all rows. See `iter_search` to stream the rows.
+        With a `sink` (see `idms.sinks`) rows are written to the sink while paging and the number of rows is returned.
+        Example: {self.baseUrl}/api/v2/search?where=`complexQuery`&limit=`limit`&metadata=`metadata`
+
+        :param str `complexQuery`:  See documentation for search options for a complexQuery: https://docs2.cer-rec.gc.ca/ll-eng/llisapi.dll?func=help.index&keyword=LL.Search%20Broker.Category
+        """
+        rows = self.iter_search(complexQuery, limit, metadata, slice, resume_last_position, query_id)
+        if sink is not None:
+            return sink.writeRows(rows)
+        return list(rows)
+
+    def _postSearchRetry(self, url: str, base_data: dict) -> dict:
+        """
+        `_postSearch` with up to `maxErrorRetry` attempts.
+        """
+        errors = 0
+        while True:
+            try:
+                return self._postSearch(url, base_data)
+            except Exception as e:
+                errors = errors + 1
+                logging.debug("Error: " + str(e))
+                if errors >= self.maxErrorRetry:
+                    raise
+
+    def _shardQuery(self, complexQuery: str, shard: dict) -> str:
+        """
+        Combine the query with the predicate and date range of a shard.
+        """
+        clauses = [f"({complexQuery})"]
+        if shard.get("where"):
+            clauses.append(f"({shard['where']})")
+        if shard.get("dateRange"):
+            start, end = shard["dateRange"]
+            clauses.append(
+                self.dateRangeQuery.format(
+                    field=shard["dateField"], start=start.strftime("%Y%m%d"), end=end.strftime("%Y%m%d")
+                )
+            )
+        return " and ".join(clauses)
+
+    @staticmethod
+    def _splitShard(shard: dict) -> list:
+        """
+        Split a date range shard into two disjoint halves, returns an empty list when the shard can't be split.
+        """
+        if not shard.get("dateRange"):
+            return []
+        start, end = shard["dateRange"]
+        if end <= start:
+            return []
+        middle = start + (end - start) // 2
+        return [
+            dict(shard, dateRange=(start, middle)),
+            dict(shard, dateRange=(middle + datetime.timedelta(days=1), end)),
+        ]
+
+    def _searchShard(self, complexQuery: str, shard: dict, limit: int, metadata: str, maxShardResults: int) -> tuple:
+        """
+        Fetch all pages of one shard and return (rows, []). When the first page reports more then `maxShardResults`
+        results and the shard can be split, nothing is fetched further and ([], halves) is returned.
+        """
+        base_data = {"where": self._shardQuery(complexQuery, shard), "limit": limit, "metadata": metadata}
+        if shard.get("slice"):
+            base_data["slice"] = shard["slice"]
+
+        url = self.baseUrl + "/api/v2/search"
+        rows = []
+        counter = 0
+        while url and counter < self.maxCallsPerFolder:
+            search_results = self._postSearchRetry(url, base_data)
+            if counter == 0:
+                total = dotfield(search_results, "collection.paging.total_count", 0) or 0
+                halves = self._splitShard(shard)
+                if total > maxShardResults and halves:
+                    logging.debug(f"Split shard {shard} with {total} results")
+                    return [], halves
+            counter = counter + 1
+            rows.extend(self.parseSearchResult(result, complexQuery) for result in search_results.get("results", []))
+            nextUrl = dotfield(search_results, "collection.paging.links.next.href")
+            url = self.baseUrl + nextUrl if nextUrl else ""
+
+        if counter >= self.maxCallsPerFolder:
+            logging.warning(
+                f"Stopped due counter ({counter}) reached the maxCallsPerFolder ({self.maxCallsPerFolder}) limit!"
+            )
+        return rows, []
+
+    def search_parallel(
+        self,
+        complexQuery: str,
+        dateRange: tuple = None,
+        dateField: str = "OTModifyDate",
+        slices: list = None,
+        predicates: list = None,
+        workers: int = 4,
+        limit: int = 100,
+        metadata: str = "true",
+        maxShardResults: int = 10000,
+    ) -> list:
+        """
+        Split a search into disjoint shards and search the shards concurrently with `workers` threads.
+        Shards are the combinations of `predicates` (extra where clauses), `slices` and the `dateRange`
+        (tuple of two `datetime.date`, inclusive) on `dateField`. A date shard with more then `maxShardResults`
+        results is split in two halves, a shard below that is paged sequentially by one worker.
+        Rows are de-duplicated on `properties.id`, the order of the rows is not defined.
+        """
+        shards = [
+            {"where": where, "slice": slice, "dateRange": dateRange, "dateField": dateField}
+            for where in (predicates or [None])
+            for slice in (slices or [None])
+        ]
+
+        results = {}
+        rowsWithoutId = []
+
+        def merge(rows: list):
+            for row in rows:
+                nodeId = row.get("properties.id")
+                if nodeId is None:
+                    rowsWithoutId.append(row)
+                elif nodeId not in results:
+                    results[nodeId] = row
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {
+                pool.submit(self._searchShard, complexQuery, shard, limit, metadata, maxShardResults)
+                for shard in shards
+            }
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        rows, halves = future.result()
+                        merge(rows)
+                        for half in halves:
+                            pending.add(
+                                pool.submit(self._searchShard, complexQuery, half, limit, metadata, maxShardResults)
+                            )
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        return list(results.values()) + rowsWithoutId
+
+    def search_many(
+        self,
+        queries: list,
+        workers: int = 4,
+        limit: int = None,
+        metadata: str = "true",
+        resume_last_position=True,
+        sink=None,
+    ):
+        """
+        Run many searches concurrently with `workers` threads and merge their hits on `properties.id`: a node found by
+        several queries is one row, its `complexQuery` is the list of the queries that found it. All searches share
+        `self.rateLimiter` and keep their own resume position in the journal (see `iter_search`).
+        Rows are in the order of a sequential run of the queries, with a `sink` the rows are written to the sink and
+        the number of rows is returned.
+        """
+        queries = list(dict.fromkeys(queries))
+        # Opened here once instead of by the first workers at the same time.
+        self.searchJournal()
+        lock = threading.Lock()
+        # properties.id -> [(query index, position), row, indexes of the matching queries]
+        results = {}
+        rowsWithoutId = []
+        duplicates = [0]
+
+        def run(index: int, query: str):
+            position = 0
+            for page in self.iter_search(query, limit, metadata, None, resume_last_position, by_page=True):
+                with lock:
+                    for row in page:
+                        key = (index, position)
+                        position = position + 1
+                        nodeId = row.get("properties.id")
+                        entry = results.get(nodeId) if nodeId is not None else None
+                        if nodeId is None:
+                            rowsWithoutId.append([key, row, {index}])
+                        elif entry is None:
+                            results[nodeId] = [key, row, {index}]
+                        else:
+                            duplicates[0] = duplicates[0] + 1
+                            entry[2].add(index)
+                            if key < entry[0]:
+                                entry[0] = key
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run, index, query) for index, query in enumerate(queries)]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
 
-        return results.tolist()
+        logging.info(f"search_many: {len(results)} distinct nodes, {duplicates[0]} duplicate hits merged")
+        entries = sorted(list(results.values()) + rowsWithoutId, key=lambda entry: entry[0])
+        rows = []
+        for _, row, indexes in entries:
+            row["complexQuery"] = [queries[index] for index in sorted(indexes)]
+            rows.append(row)
+        if sink is not None:
+            return sink.writeRows(rows)
+        return rows
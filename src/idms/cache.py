@@ -0,0 +1,218 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+class lruCache:
+    """
+    Thread safe least recently used cache with hit and miss counters.
+    With `ttl` (seconds) entries expire, an expired entry counts as a miss.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                self.misses = self.misses + 1
+                return default
+            if expires is not None and self.clock() >= expires:
+                del self._data[key]
+                self.misses = self.misses + 1
+                return default
+            self._data.move_to_end(key)
+            self.hits = self.hits + 1
+            return value
+
+    def put(self, key, value, ttl: float = None):
+        """
+        Add an entry, `ttl` overrides the ttl of the cache for this entry.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (value, None if ttl is None else self.clock() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class diskCache:
+    """
+    Json values in a SQLite file (zlib compressed) that expire after `ttl` seconds. When the values take more than
+    `maxBytes` the least recently used entries are removed.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600, maxBytes: int = 256 * 1024 * 1024, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.maxBytes = maxBytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+            """
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def size(self) -> int:
+        """
+        Bytes of all stored values.
+        """
+        with self._lock:
+            return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def get(self, key: str, default=None) -> tuple:
+        """
+        (value, age in seconds) of an entry, `default` when missing or expired.
+        """
+        now = self.clock()
+        with self._lock:
+            row = self.connection.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                if row is not None:
+                    self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.connection.commit()
+                self.misses = self.misses + 1
+                return default
+            self.connection.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            self.hits = self.hits + 1
+        return json.loads(zlib.decompress(row[0])), now - row[1]
+
+    def put(self, key: str, value):
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        now = self.clock()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, used) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self.connection.execute("DELETE FROM entries WHERE created <= ?", (now - self.ttl,))
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.maxBytes:
+                # Remove the least recently used entries until the values fit.
+                for oldKey, size in self.connection.execute("SELECT key, size FROM entries ORDER BY used").fetchall():
+                    if total <= self.maxBytes:
+                        break
+                    self.connection.execute("DELETE FROM entries WHERE key = ?", (oldKey,))
+                    total = total - size
+            self.connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.commit()
+
+
+class searchCache:
+    """
+    Two tier cache of search pages (set `crawler.searchCache`): an in-memory `lruCache` of `memoryItems` pages in
+    front of an optional `diskCache` at `path` that is shared by later runs and other processes. Pages are keyed by
+    the normalized query parameters including the page cursor, and expire after `ttl` seconds.
+
+    Searches with a cache don't tune their page size (see `crawler.searchPageSize`) so repeated searches ask for the
+    same pages, pass a `limit` for pages larger than 10 rows.
+    """
+
+    def __init__(
+        self,
+        path: str = "idms_search_cache.sqlite",
+        ttl: float = 3600,
+        memoryItems: int = 1000,
+        maxBytes: int = 256 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.memory = lruCache(memoryItems, ttl)
+        self.disk = diskCache(path, ttl, maxBytes) if path else None
+
+    @staticmethod
+    def key(url: str, data: dict) -> str:
+        """
+        Key of a search page: the search endpoint and the form data (query, slice, limit, page, ...) with the
+        whitespace of the values normalized.
+        """
+        params = sorted((str(k), " ".join(str(v).split())) for k, v in data.items())
+        return hashlib.sha256(json.dumps([url.rstrip("/"), params]).encode("utf-8")).hexdigest()
+
+    @property
+    def hits(self) -> int:
+        return self.memory.hits + (self.disk.hits if self.disk is not None else 0)
+
+    @property
+    def misses(self) -> int:
+        return self.disk.misses if self.disk is not None else self.memory.misses
+
+    def stats(self) -> dict:
+        return {
+            "memoryHits": self.memory.hits,
+            "diskHits": self.disk.hits if self.disk is not None else 0,
+            "misses": self.misses,
+            "memoryItems": len(self.memory),
+            "diskBytes": self.disk.size() if self.disk is not None else 0,
+        }
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        entry = self.disk.get(key)
+        if entry is None:
+            return None
+        value, age = entry
+        self.memory.put(key, value, self.ttl - age)
+        return value
+
+    def put(self, key: str, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,126 @@
+import atexit
+import datetime
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import threading
+
+
+class debugWriter:
+    """
+    Background writer for raw API responses (`crawler.debugJson`). Responses are queued and written by a thread as
+    json lines to rotating gzip segments: `<directory>/<prefix>_<timestamp>_<n>.jsonl.gz`.
+
+    sampleRate: fraction of the responses that is kept (0.0 - 1.0).
+    maxSegmentBytes: compressed size after which a new segment is started.
+    maxTotalBytes: compressed size of all segments, the oldest segments are removed above it.
+    queueSize: responses waiting to be written, when the queue is full responses are dropped instead of waiting.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".",
+        prefix: str = "debug",
+        sampleRate: float = 1.0,
+        maxSegmentBytes: int = 64 * 1024 * 1024,
+        maxTotalBytes: int = 1024 * 1024 * 1024,
+        queueSize: int = 1000,
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.sampleRate = sampleRate
+        self.maxSegmentBytes = maxSegmentBytes
+        self.maxTotalBytes = maxTotalBytes
+
+        self.written = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.segments = []
+
+        self._queue = queue.Queue(maxsize=queueSize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._raw = None
+        self._file = None
+        self._closedBytes = 0
+        self._segmentNumber = 0
+
+    def write(self, data: dict):
+        """
+        Queue a response for writing, returns immediately.
+        """
+        if self.sampleRate < 1.0 and random.random() >= self.sampleRate:
+            self.skipped = self.skipped + 1
+            return
+        self._start()
+        try:
+            self._queue.put_nowait((datetime.datetime.now().isoformat(), data))
+        except queue.Full:
+            self.dropped = self.dropped + 1
+
+    def close(self):
+        """
+        Write all queued responses and close the current segment.
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._thread = threading.Thread(target=self._run, name="idms-debugwriter", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._writeRecord(*item)
+            except Exception as e:
+                logging.debug(f"Debug writer error: {e}")
+            if self._queue.empty() and self._file is not None:
+                self._file.flush()
+        self._closeSegment()
+
+    def _writeRecord(self, timestamp: str, data: dict):
+        if self._file is None or self._raw.tell() >= self.maxSegmentBytes:
+            self._rotate()
+        self._file.write((json.dumps({"time": timestamp, "data": data}) + "\n").encode("utf-8"))
+        self.written = self.written + 1
+
+    def _closeSegment(self):
+        if self._file is not None:
+            self._file.close()
+            self._closedBytes = self._closedBytes + self._raw.tell()
+            self._raw.close()
+            self._file = None
+            self._raw = None
+
+    def _rotate(self):
+        self._closeSegment()
+        # Remove the oldest segments when the size cap is reached.
+        while self.segments and self._closedBytes >= self.maxTotalBytes:
+            oldest = self.segments.pop(0)
+            try:
+                self._closedBytes = self._closedBytes - os.path.getsize(oldest)
+                os.remove(oldest)
+            except OSError as e:
+                logging.debug(f"Debug writer could not remove {oldest}: {e}")
+        yyyymmddhhmmss = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+        self._segmentNumber = self._segmentNumber + 1
+        path = os.path.join(self.directory, f"{self.prefix}_{yyyymmddhhmmss}_{self._segmentNumber:04d}.jsonl.gz")
+        self.segments.append(path)
+        self._raw = open(path, "wb")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="wb")
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+
+def fileChecksum(path: str, chunkSize: int = 1024 * 1024) -> str:
+    """
+    sha256 hex digest of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def safeFileName(name: str) -> str:
+    """
+    Replace the characters that are not allowed in a Windows or Linux file name.
+    """
+    return re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", str(name or "")).strip(" .")
+
+
+class downloadManifest:
+    """
+    Records of downloaded files (node id, path, size, sha256, status) as json lines, appended by all download
+    workers. When a node occurs more than once the last record counts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[str(record.get("id"))] = record
+        self._file = open(path, "a", encoding="utf-8")
+
+    def get(self, nodeId) -> dict:
+        return self.records.get(str(nodeId))
+
+    def add(self, record: dict):
+        with self._lock:
+            self.records[str(record.get("id"))] = record
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,70 @@
+import collections
+import json
+import os
+import tempfile
+
+
+class frontierQueue:
+    """
+    First in first out queue of json serializable items that keeps at most about `memoryLimit` items in memory.
+    Beyond that the newest items are written to spill files in `directory` (default: the temp directory) and read
+    back in order when the in memory items are used up.
+
+    default: function for objects json can't serialize (see `json.dumps`), spilled items are read back as plain json.
+    """
+
+    def __init__(self, memoryLimit: int = 10000, directory: str = None, default=None):
+        self.memoryLimit = max(1, memoryLimit)
+        self.directory = directory
+        self.default = default
+        self.spilled = 0
+        self._head = collections.deque()
+        self._tail = collections.deque()
+        self._segments = collections.deque()
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def push(self, item):
+        self._tail.append(item)
+        self._length = self._length + 1
+        if len(self._head) + len(self._tail) > self.memoryLimit and len(self._tail) >= self.memoryLimit // 2:
+            self._spill()
+
+    def pop(self):
+        if not self._head:
+            if self._segments:
+                self._head = self._load(self._segments.popleft())
+            else:
+                self._head, self._tail = self._tail, collections.deque()
+        item = self._head.popleft()
+        self._length = self._length - 1
+        return item
+
+    def close(self):
+        """
+        Remove the spill files that are not read yet.
+        """
+        while self._segments:
+            os.remove(self._segments.popleft()[0])
+
+    def _spill(self):
+        fd, path = tempfile.mkstemp(prefix="idms_frontier_", suffix=".jsonl", dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for item in self._tail:
+                f.write(json.dumps(item, default=self.default) + "\n")
+        self._segments.append((path, len(self._tail)))
+        self.spilled = self.spilled + len(self._tail)
+        self._tail = collections.deque()
+
+    @staticmethod
+    def _load(segment: tuple) -> collections.deque:
+        path, _ = segment
+        with open(path, encoding="utf-8") as f:
+            items = collections.deque(json.loads(line) for line in f)
+        os.remove(path)
+        return items
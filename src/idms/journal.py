@@ -0,0 +1,195 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+
+
+class crawlJournal:
+    """
+    Persistent crawl state (SQLite) to resume interrupted crawls and searches.
+
+    For a tree crawl (`crawler.children`) the journal keeps per folder whether it is pending or done, the page that
+    is being processed and how many rows of that page are yielded. A restarted crawl skips done folders and continues
+    pending folders at their page and row. For a search the url of the next page is kept per search key.
+
+    Progress is committed at every page and folder boundary, at most `commitInterval` seconds apart while rows are
+    yielded, and when the crawl stops with an exception.
+    """
+
+    def __init__(self, path: str = "idms_journal.sqlite", commitInterval: float = 1.0):
+        self.path = path
+        self.commitInterval = commitInterval
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._lastCommit = time.monotonic()
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS crawls (
+                crawl_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                updated TEXT
+            );
+            CREATE TABLE IF NOT EXISTS folders (
+                crawl_id TEXT NOT NULL,
+                folder_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                page INTEGER NOT NULL DEFAULT 1,
+                position INTEGER NOT NULL DEFAULT 0,
+                parents TEXT,
+                depth INTEGER,
+                stop_recursive INTEGER NOT NULL DEFAULT 0,
+                modify_date TEXT,
+                updated TEXT,
+                PRIMARY KEY (crawl_id, folder_id)
+            );
+            CREATE TABLE IF NOT EXISTS searches (
+                search_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                updated TEXT
+            );
+            """
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def commit(self):
+        with self._lock:
+            self.connection.commit()
+            self._lastCommit = time.monotonic()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self.connection.execute(sql, params)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat()
+
+    # Tree crawls
+
+    def startCrawl(self, crawlId: str):
+        """
+        Start or resume a crawl, a crawl that was finished before is started again from scratch.
+        """
+        row = self._execute("SELECT status FROM crawls WHERE crawl_id = ?", (crawlId,)).fetchone()
+        if row is not None and row[0] == "done":
+            self.resetCrawl(crawlId)
+        self._execute(
+            "INSERT OR REPLACE INTO crawls (crawl_id, status, updated) VALUES (?, 'running', ?)", (crawlId, self._now())
+        )
+        self.commit()
+
+    def finishCrawl(self, crawlId: str):
+        self._execute("UPDATE crawls SET status = 'done', updated = ? WHERE crawl_id = ?", (self._now(), crawlId))
+        self.commit()
+
+    def resetCrawl(self, crawlId: str):
+        self._execute("DELETE FROM folders WHERE crawl_id = ?", (crawlId,))
+        self._execute("DELETE FROM crawls WHERE crawl_id = ?", (crawlId,))
+        self.commit()
+
+    def folderState(self, crawlId: str, folderId) -> dict:
+        """
+        State of a folder in a crawl or None: {"status": "pending" | "done", "page": int, "position": int}
+        """
+        row = self._execute(
+            "SELECT status, page, position FROM folders WHERE crawl_id = ? AND folder_id = ?", (crawlId, int(folderId))
+        ).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "page": row[1], "position": row[2]}
+
+    def startFolder(
+        self,
+        crawlId: str,
+        folderId,
+        parents: list = None,
+        depth: int = None,
+        stopRecursive: bool = False,
+        modifyDate: str = None,
+    ):
+        """
+        Add a folder as pending, `depth`, `stopRecursive` and `modifyDate` are kept to resume breadth first crawls.
+        """
+        self._execute(
+            "INSERT OR IGNORE INTO folders (crawl_id, folder_id, status, parents, depth, stop_recursive, modify_date, "
+            "updated) VALUES (?, ?, 'pending', ?, ?, ?, ?, ?)",
+            (
+                crawlId,
+                int(folderId),
+                json.dumps(list(parents or [])),
+                depth,
+                int(bool(stopRecursive)),
+                modifyDate,
+                self._now(),
+            ),
+        )
+
+    def savePosition(self, crawlId: str, folderId, page: int, position: int):
+        """
+        Save that `position` rows of `page` of a folder are processed, committed at most every `commitInterval`.
+        """
+        self._execute(
+            "UPDATE folders SET page = ?, position = ? WHERE crawl_id = ? AND folder_id = ?",
+            (page, position, crawlId, int(folderId)),
+        )
+        if position == 0 or time.monotonic() - self._lastCommit >= self.commitInterval:
+            self.commit()
+
+    def finishFolder(self, crawlId: str, folderId):
+        self._execute(
+            "UPDATE folders SET status = 'done', updated = ? WHERE crawl_id = ? AND folder_id = ?",
+            (self._now(), crawlId, int(folderId)),
+        )
+        self.commit()
+
+    def pendingFolders(self, crawlId: str) -> list:
+        """
+        Folders of a crawl that are started but not done, in the order they were added.
+        """
+        rows = self._execute(
+            "SELECT folder_id, page, position, parents, depth, stop_recursive, modify_date FROM folders "
+            "WHERE crawl_id = ? AND status = 'pending' ORDER BY rowid",
+            (crawlId,),
+        ).fetchall()
+        return [
+            {
+                "id": r[0],
+                "page": r[1],
+                "position": r[2],
+                "parents": json.loads(r[3] or "[]"),
+                "depth": r[4] or 1,
+                "stopRecursive": bool(r[5]),
+                "modifyDate": r[6],
+            }
+            for r in rows
+        ]
+
+    # Searches
+
+    def searchPosition(self, searchKey: str) -> str:
+        """
+        Url of the next page of an unfinished search or None.
+        """
+        row = self._execute("SELECT url FROM searches WHERE search_key = ?", (searchKey,)).fetchone()
+        return row[0] if row else None
+
+    def saveSearchPosition(self, searchKey: str, url: str):
+        self._execute(
+            "INSERT OR REPLACE INTO searches (search_key, url, updated) VALUES (?, ?, ?)", (searchKey, url, self._now())
+        )
+        self.commit()
+
+    def finishSearch(self, searchKey: str):
+        self._execute("DELETE FROM searches WHERE search_key = ?", (searchKey,))
+        self.commit()
@@ -0,0 +1,280 @@
+import heapq
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Upper bounds in seconds of the latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def endpointName(url: str) -> str:
+    """
+    Path of a url with the node ids replaced, used to group requests per endpoint.
+
+    Example:
+    endpointName("https://host/otcs/cs.exe/api/v2/nodes/123/nodes?page=2") -> "/otcs/cs.exe/api/v2/nodes/{id}/nodes"
+    """
+    return re.sub(r"/\d+(?=/|$)", "/{id}", urlsplit(url).path)
+
+
+class histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] = self.counts[i] + 1
+        self.sum = self.sum + value
+        self.count = self.count + 1
+
+    def cumulative(self) -> list:
+        """
+        (upper bound, number of observations <= bound) per bucket, the last bound is "+Inf".
+        """
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total = total + count
+            result.append((bound, total))
+        return result
+
+
+class crawlMetrics:
+    """
+    Metrics of a crawler (set `crawler.metrics`): per endpoint latency histograms, status codes, bytes and retries of
+    every request, pages and rows (per second since the start) and the time spent fetching the pages of each folder.
+
+    hooks: functions called as hook(event, data) for every "request", "page" and "folder" event.
+    exportPath: file the metrics are written to every `exportInterval` seconds, in Prometheus text format when the
+    file ends with .prom or .txt and as json otherwise.
+    slowFolders: number of slowest folders that are kept.
+    """
+
+    def __init__(self, hooks: list = None, exportPath: str = None, exportInterval: float = 60.0, slowFolders: int = 20):
+        self.hooks = list(hooks or [])
+        self.exportPath = exportPath
+        self.exportInterval = exportInterval
+        self.slowFolders = slowFolders
+
+        self.started = time.time()
+        self.endpoints = {}
+        self.pages = 0
+        self.rows = 0
+        self.folders = 0
+        self.folderSeconds = histogram()
+
+        self._slowest = []
+        self._lock = threading.Lock()
+        self._lastExport = time.monotonic()
+
+    def addHook(self, hook):
+        self.hooks.append(hook)
+
+    def _endpoint(self, endpoint: str) -> dict:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = {
+                "latency": histogram(),
+                "status": {},
+                "requestBytes": 0,
+                "responseBytes": 0,
+                "retries": 0,
+            }
+        return stats
+
+    def recordRequest(
+        self,
+        method: str,
+        url: str,
+        status: int,
+        seconds: float,
+        requestBytes: int = 0,
+        responseBytes: int = 0,
+        retries: int = 0,
+    ):
+        """
+        Record a request, `status` is None when no response was received, `retries` counts the retries (of the
+        `Retry` adapter and for 429) before this response.
+        """
+        endpoint = endpointName(url)
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats["latency"].observe(seconds)
+            key = str(status) if status is not None else "error"
+            stats["status"][key] = stats["status"].get(key, 0) + 1
+            stats["requestBytes"] = stats["requestBytes"] + (requestBytes or 0)
+            stats["responseBytes"] = stats["responseBytes"] + (responseBytes or 0)
+            stats["retries"] = stats["retries"] + retries
+        self._emit(
+            "request",
+            {
+                "method": method,
+                "endpoint": endpoint,
+                "url": url,
+                "status": status,
+                "seconds": seconds,
+                "requestBytes": requestBytes,
+                "responseBytes": responseBytes,
+                "retries": retries,
+            },
+        )
+
+    def recordPage(self, rows: int, nodeId=None):
+        with self._lock:
+            self.pages = self.pages + 1
+            self.rows = self.rows + rows
+        self._emit("page", {"id": nodeId, "rows": rows})
+
+    def recordFolder(self, nodeId, seconds: float, pages: int, rows: int):
+        """
+        Record a crawled folder, `seconds` is the time spent fetching its pages.
+        """
+        with self._lock:
+            self.folders = self.folders + 1
+            self.folderSeconds.observe(seconds)
+            entry = (seconds, str(nodeId), pages, rows)
+            if len(self._slowest) < self.slowFolders:
+                heapq.heappush(self._slowest, entry)
+            elif self._slowest and entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+        self._emit("folder", {"id": nodeId, "seconds": seconds, "pages": pages, "rows": rows})
+
+    def _emit(self, event: str, data: dict):
+        """
+        Call the hooks and export when the interval has passed. Errors are logged, metrics never fail a request.
+        """
+        for hook in self.hooks:
+            try:
+                hook(event, data)
+            except Exception as e:
+                logging.warning(f"Metrics hook {hook!r} failed: {e}")
+        if not self.exportPath:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._lastExport < self.exportInterval:
+                return
+            self._lastExport = now
+        try:
+            self.export()
+        except Exception as e:
+            logging.warning(f"Export of metrics to {self.exportPath} failed: {e}")
+
+    def snapshot(self) -> dict:
+        """
+        All metrics as a json serializable dict.
+        """
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            return {
+                "started": self.started,
+                "seconds": elapsed,
+                "pages": self.pages,
+                "rows": self.rows,
+                "pagesPerSecond": self.pages / elapsed,
+                "rowsPerSecond": self.rows / elapsed,
+                "folders": self.folders,
+                "folderSeconds": {"sum": self.folderSeconds.sum, "buckets": self.folderSeconds.cumulative()},
+                "slowestFolders": [
+                    {"id": nodeId, "seconds": seconds, "pages": pages, "rows": rows}
+                    for seconds, nodeId, pages, rows in sorted(self._slowest, reverse=True)
+                ],
+                "endpoints": {
+                    endpoint: {
+                        "requests": stats["latency"].count,
+                        "seconds": stats["latency"].sum,
+                        "latency": stats["latency"].cumulative(),
+                        "status": dict(stats["status"]),
+                        "requestBytes": stats["requestBytes"],
+                        "responseBytes": stats["responseBytes"],
+                        "retries": stats["retries"],
+                    }
+                    for endpoint, stats in self.endpoints.items()
+                },
+            }
+
+    def prometheus(self) -> str:
+        """
+        Metrics in the Prometheus text exposition format.
+        """
+        data = self.snapshot()
+        lines = [
+            "# HELP idms_request_duration_seconds Duration of Content Server requests.",
+            "# TYPE idms_request_duration_seconds histogram",
+        ]
+        for endpoint, stats in data["endpoints"].items():
+            for bound, count in stats["latency"]:
+                lines.append(f'idms_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+            lines.append(f'idms_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats["seconds"]}')
+            lines.append(f'idms_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats["requests"]}')
+
+        lines.append("# HELP idms_requests_total Requests per endpoint and status code.")
+        lines.append("# TYPE idms_requests_total counter")
+        for endpoint, stats in data["endpoints"].items():
+            for status, count in stats["status"].items():
+                lines.append(f'idms_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        counters = [
+            ("idms_request_bytes_total", "Bytes sent per endpoint.", "requestBytes"),
+            ("idms_response_bytes_total", "Bytes received per endpoint.", "responseBytes"),
+            ("idms_retries_total", "Retried requests per endpoint.", "retries"),
+        ]
+        for name, description, key in counters:
+            lines.extend([f"# HELP {name} {description}", f"# TYPE {name} counter"])
+            for endpoint, stats in data["endpoints"].items():
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {stats[key]}')
+
+        lines.extend(
+            [
+                "# TYPE idms_pages_total counter",
+                f"idms_pages_total {data['pages']}",
+                "# TYPE idms_rows_total counter",
+                f"idms_rows_total {data['rows']}",
+                "# TYPE idms_pages_per_second gauge",
+                f"idms_pages_per_second {data['pagesPerSecond']}",
+                "# TYPE idms_rows_per_second gauge",
+                f"idms_rows_per_second {data['rowsPerSecond']}",
+                "# HELP idms_folder_fetch_seconds Time spent fetching the pages of a folder.",
+                "# TYPE idms_folder_fetch_seconds histogram",
+            ]
+        )
+        for bound, count in data["folderSeconds"]["buckets"]:
+            lines.append(f'idms_folder_fetch_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f"idms_folder_fetch_seconds_sum {data['folderSeconds']['sum']}")
+        lines.append(f"idms_folder_fetch_seconds_count {data['folders']}")
+        lines.append("# TYPE idms_slow_folder_fetch_seconds gauge")
+        for folder in data["slowestFolders"]:
+            lines.append(f'idms_slow_folder_fetch_seconds{{folder="{folder["id"]}"}} {folder["seconds"]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str = None):
+        """
+        Write the metrics to `path` (default: `exportPath`), replaced at once so readers never see a partial file.
+        """
+        path = path or self.exportPath
+        if path.endswith((".prom", ".txt")):
+            content = self.prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        # A tmp file per write, exports of other threads and processes don't touch it.
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
@@ -0,0 +1,203 @@
+import datetime
+import json
+import sqlite3
+
+# Full-text columns of the index and the row column they are taken from.
+TEXT_COLUMNS = {
+    "name": "properties.name",
+    "description": "properties.description",
+    "summary": "properties.summary",
+    "location": "locationPathString",
+}
+
+# Row columns that are not added to the `metadata` full-text column.
+SKIP_METADATA_COLUMNS = ("downloadUrl", "viewUrl", "complexQuery")
+
+
+def isoDate(value) -> str:
+    """
+    Date filter as ISO string, accepts a `datetime.date`, `datetime.datetime` or a string.
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class nodeIndex:
+    """
+    Local full-text index (SQLite FTS5) of crawl and search rows, to query crawled metadata offline.
+
+    The name, description, summary and location path of a node are indexed as separate columns, the other text values
+    of the row (see `crawler.outputColumns`) as `metadata`. Type, owner, size and dates are kept as plain columns for
+    filters. Rows are keyed by `properties.id`: adding the rows of a later crawl or search updates the index, rows
+    whose `modify_date` and location did not change are skipped.
+
+    The index is a sink, so a crawl can be indexed while it runs:
+    with nodeIndex("idms_index.sqlite") as index:
+        idms.children(startNode, sink=index)
+        rows = index.search("pipeline*", type=144, modifiedAfter=datetime.date(2020, 1, 1))
+    """
+
+    def __init__(self, path: str = "idms_index.sqlite", commitEvery: int = 10000):
+        self.path = path
+        self.commitEvery = commitEvery
+        self.rowCount = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS nodes (
+                id INTEGER PRIMARY KEY,
+                parent_id INTEGER,
+                type INTEGER,
+                type_name TEXT,
+                owner TEXT,
+                size INTEGER,
+                create_date TEXT,
+                modify_date TEXT,
+                location TEXT,
+                row TEXT NOT NULL,
+                indexed_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS nodes_parent ON nodes (parent_id);
+            CREATE INDEX IF NOT EXISTS nodes_modify_date ON nodes (modify_date);
+            CREATE VIRTUAL TABLE IF NOT EXISTS nodes_fts USING fts5 (name, description, summary, location, metadata);
+            """
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    @staticmethod
+    def _metadata(row: dict) -> str:
+        values = []
+        for column, value in row.items():
+            if column in TEXT_COLUMNS.values() or column in SKIP_METADATA_COLUMNS or column.endswith("_date"):
+                continue
+            if isinstance(value, str) and value:
+                values.append(value)
+        return " ".join(values)
+
+    def write(self, row: dict) -> bool:
+        """
+        Add or update one row, returns False when the row has no id or did not change since it was indexed.
+        """
+        nodeId = row.get("properties.id")
+        if nodeId is None or nodeId == "":
+            return False
+        nodeId = int(nodeId)
+        self.rowCount = self.rowCount + 1
+        location = row.get("locationPathString")
+        stored = self.connection.execute("SELECT modify_date, location FROM nodes WHERE id = ?", (nodeId,)).fetchone()
+        if stored is not None and stored[0] == row.get("properties.modify_date") and stored[1] == location:
+            return False
+
+        size = row.get("properties.size")
+        self.connection.execute(
+            "INSERT OR REPLACE INTO nodes (id, parent_id, type, type_name, owner, size, create_date, modify_date, "
+            "location, row, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                nodeId,
+                row.get("properties.parent_id"),
+                row.get("properties.type"),
+                row.get("properties.type_name"),
+                row.get("properties.owner"),
+                size if isinstance(size, int) else None,
+                row.get("properties.create_date"),
+                row.get("properties.modify_date"),
+                location,
+                json.dumps(dict(row)),
+                datetime.datetime.now().isoformat(),
+            ),
+        )
+        self.connection.execute("DELETE FROM nodes_fts WHERE rowid = ?", (nodeId,))
+        self.connection.execute(
+            "INSERT INTO nodes_fts (rowid, name, description, summary, location, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+            [nodeId] + [str(row.get(column) or "") for column in TEXT_COLUMNS.values()] + [self._metadata(row)],
+        )
+        if self.rowCount % self.commitEvery == 0:
+            self.connection.commit()
+        return True
+
+    def writeRows(self, rows) -> int:
+        """
+        Add or update all rows of an iterable (for example `crawler.iter_children`), returns the number of rows.
+        """
+        count = 0
+        for row in rows:
+            self.write(row)
+            count = count + 1
+        self.connection.commit()
+        return count
+
+    def remove(self, nodeIds: list):
+        """
+        Remove nodes from the index, for example nodes that were deleted on the server.
+        """
+        ids = [(int(nodeId),) for nodeId in nodeIds]
+        self.connection.executemany("DELETE FROM nodes WHERE id = ?", ids)
+        self.connection.executemany("DELETE FROM nodes_fts WHERE rowid = ?", ids)
+        self.connection.commit()
+
+    def search(
+        self,
+        text: str = None,
+        type=None,
+        owner: str = None,
+        minSize: int = None,
+        maxSize: int = None,
+        modifiedAfter=None,
+        modifiedBefore=None,
+        createdAfter=None,
+        createdBefore=None,
+        parentId=None,
+        limit: int = 100,
+    ) -> list:
+        """
+        Rows matching the full-text query `text` (FTS5 syntax, for example `pipeline*`, `name:report` or
+        `"gas leiding" OR olie`) and all given filters, best matches first. Without `text` the most recently modified
+        rows come first. `type` is a node type or a list of types, dates are inclusive. `limit` None returns all rows.
+        """
+        clauses = []
+        params = []
+        if type is not None:
+            types = list(type) if isinstance(type, (list, tuple, set)) else [type]
+            clauses.append(f"nodes.type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        filters = [
+            ("nodes.owner = ?", owner),
+            ("nodes.size >= ?", minSize),
+            ("nodes.size <= ?", maxSize),
+            ("nodes.modify_date >= ?", isoDate(modifiedAfter)),
+            ("substr(nodes.modify_date, 1, ?) <= ?", isoDate(modifiedBefore)),
+            ("nodes.create_date >= ?", isoDate(createdAfter)),
+            ("substr(nodes.create_date, 1, ?) <= ?", isoDate(createdBefore)),
+            ("nodes.parent_id = ?", parentId),
+        ]
+        for clause, value in filters:
+            if value is None:
+                continue
+            clauses.append(clause)
+            # An end date includes the whole day (or time prefix) it names.
+            params.extend([len(value), value] if clause.startswith("substr") else [value])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        if text:
+            sql = (
+                f"SELECT nodes.row FROM nodes JOIN (SELECT rowid, bm25(nodes_fts) AS rank FROM nodes_fts "
+                f"WHERE nodes_fts MATCH ?) AS matches ON matches.rowid = nodes.id {where} ORDER BY matches.rank LIMIT ?"
+            )
+            params = [text] + params
+        else:
+            sql = f"SELECT nodes.row FROM nodes {where} ORDER BY nodes.modify_date DESC LIMIT ?"
+        rows = self.connection.execute(sql, params + [-1 if limit is None else limit]).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,126 @@
+import datetime
+import json
+import sqlite3
+import threading
+
+
+class nodeStore:
+    """
+    On disk store (SQLite) of crawled nodes, used by `crawler.children` for incremental crawls.
+
+    Per folder the `modify_date`, the parent chain and whether all pages were fetched are kept. Per node the raw node
+    data is kept, keyed by the folder it was listed in and `properties.id`. The store can be used from any thread.
+    """
+
+    def __init__(self, path: str = "idms_nodes.sqlite"):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS folders (
+                id INTEGER PRIMARY KEY,
+                modify_date TEXT,
+                parents TEXT,
+                complete INTEGER NOT NULL DEFAULT 0,
+                crawled_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS nodes (
+                folder_id INTEGER NOT NULL,
+                id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                modify_date TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (folder_id, id)
+            );
+            CREATE INDEX IF NOT EXISTS nodes_id ON nodes (id);
+            CREATE INDEX IF NOT EXISTS nodes_position ON nodes (folder_id, position);
+            """
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def folder(self, folderId) -> dict:
+        """
+        Stored state of a folder or None: {"modify_date": str, "parents": list, "complete": bool}
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT modify_date, parents, complete FROM folders WHERE id = ?", (int(folderId),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"modify_date": row[0], "parents": json.loads(row[1] or "[]"), "complete": bool(row[2])}
+
+    def isUnchanged(self, folderId, modifyDate: str) -> bool:
+        """
+        True when the folder was crawled completely before and its `modify_date` is the same.
+        """
+        folder = self.folder(folderId)
+        return bool(modifyDate) and folder is not None and folder["complete"] and folder["modify_date"] == modifyDate
+
+    def beginFolder(self, folderId, modifyDate: str, parents: list):
+        """
+        Start a (re)crawl of a folder, the stored children are removed until the folder is crawled again.
+        """
+        with self._lock:
+            self.connection.execute("DELETE FROM nodes WHERE folder_id = ?", (int(folderId),))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO folders (id, modify_date, parents, complete, crawled_at) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (int(folderId), modifyDate, json.dumps(list(parents or [])), datetime.datetime.now().isoformat()),
+            )
+
+    def putPage(self, folderId, dataRows: list, offset: int):
+        """
+        Store the nodes of one page of a folder, `offset` is the position of the first node in the folder.
+        """
+        rows = [
+            (
+                int(folderId),
+                int(dataRow["properties"]["id"]),
+                offset + i,
+                dataRow["properties"].get("modify_date"),
+                json.dumps(dataRow),
+            )
+            for i, dataRow in enumerate(dataRows)
+        ]
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO nodes (folder_id, id, position, modify_date, data) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def endFolder(self, folderId):
+        """
+        Mark a folder as completely crawled.
+        """
+        with self._lock:
+            self.connection.execute("UPDATE folders SET complete = 1 WHERE id = ?", (int(folderId),))
+            self.connection.commit()
+
+    def children(self, folderId) -> list:
+        """
+        Raw node data of the children of a folder, in the order of the listing.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT data FROM nodes WHERE folder_id = ? ORDER BY position", (int(folderId),)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def node(self, nodeId) -> dict:
+        """
+        Raw node data of a node or None.
+        """
+        with self._lock:
+            row = self.connection.execute("SELECT data FROM nodes WHERE id = ? LIMIT 1", (int(nodeId),)).fetchone()
+        return json.loads(row[0]) if row else None
@@ -0,0 +1,63 @@
+import threading
+
+
+class adaptivePageSize:
+    """
+    Page size tuned from the observed server time and payload per row (moving averages): the largest of `sizes` for
+    which a page is expected to take at most `targetSeconds` and `maxBytes`. Small pages spend most of their time on
+    request overhead, so pages grow while the server answers fast and shrink when pages get slow or large.
+
+    sizes: allowed page sizes, each a multiple of the previous one so a crawl can switch size between pages. Keep the
+    largest size within the page size limit of the server.
+    """
+
+    def __init__(
+        self,
+        sizes: tuple = (25, 50, 100, 200, 400),
+        initial: int = 100,
+        targetSeconds: float = 2.0,
+        maxBytes: int = 4 * 1024 * 1024,
+        smoothing: float = 0.3,
+    ):
+        self.sizes = tuple(sorted(sizes))
+        self.targetSeconds = targetSeconds
+        self.maxBytes = maxBytes
+        self.smoothing = smoothing
+        self.secondsPerRow = None
+        self.bytesPerRow = None
+        self._size = initial
+        self._lock = threading.Lock()
+
+    def size(self) -> int:
+        return self._size
+
+    def record(self, rows: int, seconds: float, nbytes: int):
+        """
+        Add a fetched page of `rows` rows that took `seconds` and `nbytes` bytes.
+        """
+        if rows <= 0:
+            return
+        with self._lock:
+            if self.secondsPerRow is None:
+                self.secondsPerRow = seconds / rows
+                self.bytesPerRow = nbytes / rows
+            else:
+                self.secondsPerRow = self.secondsPerRow + self.smoothing * (seconds / rows - self.secondsPerRow)
+                self.bytesPerRow = self.bytesPerRow + self.smoothing * (nbytes / rows - self.bytesPerRow)
+            fits = [
+                size
+                for size in self.sizes
+                if size * self.secondsPerRow <= self.targetSeconds and size * self.bytesPerRow <= self.maxBytes
+            ]
+            self._size = fits[-1] if fits else self.sizes[0]
+
+    @staticmethod
+    def nextPage(page: int, limit: int, newLimit: int) -> tuple:
+        """
+        (page, limit) that continues after `page` of size `limit`: with `newLimit` when the rows so far fill whole
+        pages of it, else with `limit`.
+        """
+        offset = page * limit
+        if newLimit != limit and offset % newLimit == 0:
+            return offset // newLimit + 1, newLimit
+        return page + 1, limit
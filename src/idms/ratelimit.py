@@ -0,0 +1,104 @@
+import threading
+import time
+
+
+class adaptiveRateLimiter:
+    """
+    Token bucket shared by all requests of a crawler (and its worker threads), of which the rate is adjusted AIMD
+    style. A throttled (429), failed (5xx) or slow (above `targetLatency` seconds) request multiplies the rate with
+    `decrease`, the first time starting from the rate of the requests in the last second. Until then every fast
+    successful request adds 1 (slow start: the rate doubles about every second), after that it adds `increase / rate`
+    (so about `increase` requests/s per second). A `Retry-After` of a 429 pauses all requests.
+
+    rate: start rate in requests per second (default `maxRate`, the crawl is not slowed down until the server shows
+    load), kept between `minRate` and `maxRate`.
+    burst: size of the bucket, defaults to one second of requests.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        minRate: float = 0.5,
+        maxRate: float = 1000.0,
+        burst: float = None,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        targetLatency: float = 5.0,
+        clock=time.monotonic,
+    ):
+        self.rate = maxRate if rate is None else rate
+        self.minRate = minRate
+        self.maxRate = maxRate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.targetLatency = targetLatency
+        self.clock = clock
+
+        self.requests = 0
+        self.throttled = 0
+        self.decreases = 0
+
+        self._lock = threading.Lock()
+        self._tokens = self._capacity()
+        self._updated = clock()
+        self._pausedUntil = 0.0
+        self._lastDecrease = 0.0
+        self._slowStart = True
+        # Requests recorded per second, measured in windows of at least a second.
+        self._windowStart = self._updated
+        self._windowRequests = 0
+        self._observedRate = None
+
+    def _capacity(self) -> float:
+        return max(1.0, self.burst or self.rate)
+
+    def reserve(self) -> float:
+        """
+        Take a token and return the number of seconds to wait before the request may be sent.
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self._capacity(), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens = self._tokens - 1
+            self.requests = self.requests + 1
+            return max(0.0, -self._tokens / self.rate, self._pausedUntil - now)
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, latency: float, status: int = None, retryAfter: float = None):
+        """
+        Adjust the rate with the outcome of a request, `status` is None when no response was received.
+        """
+        with self._lock:
+            now = self.clock()
+            self._windowRequests = self._windowRequests + 1
+            if now - self._windowStart >= 1.0:
+                self._observedRate = self._windowRequests / (now - self._windowStart)
+                self._windowStart = now
+                self._windowRequests = 0
+            if status is None or status == 429 or status >= 500 or latency > self.targetLatency:
+                if status == 429:
+                    self.throttled = self.throttled + 1
+                    if retryAfter:
+                        self._pausedUntil = max(self._pausedUntil, now + retryAfter)
+                # Decrease at most once per latency period, requests in flight report the same overload.
+                if now - self._lastDecrease >= min(max(latency, 1.0 / self.rate), self.targetLatency):
+                    rate = self.rate
+                    if self._observedRate is not None:
+                        rate = min(rate, max(self._observedRate, self.minRate))
+                    self.rate = max(self.minRate, rate * self.decrease)
+                    self._lastDecrease = now
+                    self._slowStart = False
+                    self.decreases = self.decreases + 1
+            elif self._slowStart:
+                self.rate = min(self.maxRate, self.rate + 1.0)
+            else:
+                self.rate = min(self.maxRate, self.rate + self.increase / self.rate)
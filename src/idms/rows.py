@@ -0,0 +1,123 @@
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover - optional dependency
+    pd = None
+
+# Columns of which the string values are interned, so rows share one copy of each distinct value.
+INTERN_COLUMNS = ("nodeType", "properties.type_name", "locationPathString", "regions.OTLocation", "complexQuery")
+
+# Columns computed from the node id when they are read.
+URL_COLUMNS = {
+    "downloadUrl": "/otcs/llisapi.dll?func=ll&objId={}&objAction=download",
+    "viewUrl": "/otcs/llisapi.dll?func=ll&objId={}&objAction=browse",
+}
+
+
+class compactRow(Mapping):
+    """
+    Read-only mapping with the same keys and values as a row dict of `crawler.parseNodeColumns`, at a fraction of the
+    memory: values are kept in `__slots__` (no dict per row), the download and view urls are computed from the node
+    id when read and the strings of `INTERN_COLUMNS` are shared by all rows. Existing columns can be assigned.
+
+    Row classes are created per list of columns with `compactRowType`, set `crawler.compactRows` to crawl with them.
+    """
+
+    __slots__ = ("_id",)
+    _columns = ()
+    _keys = ()
+    _slots = {}
+    _setters = ()
+    _setterOf = {}
+
+    def __init__(self, nodeId, values):
+        self._id = nodeId
+        for setter, value in zip(self._setters, values):
+            setter(self, value)
+
+    def __getitem__(self, key):
+        url = URL_COLUMNS.get(key)
+        if url is not None:
+            return url.format(self._id)
+        try:
+            return getattr(self, self._slots[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        try:
+            setter = self._setterOf[key]
+        except KeyError:
+            raise KeyError(key) from None
+        setter(self, value)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in URL_COLUMNS or key in self._slots
+
+    def __repr__(self) -> str:
+        return f"compactRow({self.todict()!r})"
+
+    def __reduce__(self):
+        return compactRow._rebuild, (self._columns, self._id, tuple(getattr(self, s) for s in self._slots.values()))
+
+    @staticmethod
+    def _rebuild(columns: tuple, nodeId, values: tuple) -> "compactRow":
+        return compactRowType(columns)(nodeId, values)
+
+    def todict(self) -> dict:
+        return {key: self[key] for key in self._keys}
+
+
+def _interning(setter):
+    """
+    Slot setter that stores the shared copy of a string.
+    """
+
+    def store(row, value):
+        setter(row, sys.intern(value) if type(value) is str else value)
+
+    return store
+
+
+@lru_cache(maxsize=64)
+def compactRowType(columns: tuple) -> type:
+    """
+    `compactRow` class for rows with the download and view urls followed by `columns`, one slot per column.
+    """
+    slots = {column: f"c{i}" for i, column in enumerate(columns)}
+    rowType = type("compactRow", (compactRow,), {"__slots__": tuple(slots.values())})
+    rowType._columns = columns
+    rowType._keys = tuple(URL_COLUMNS) + columns
+    rowType._slots = slots
+    setters = [getattr(rowType, slot).__set__ for slot in slots.values()]
+    setters = [_interning(store) if column in INTERN_COLUMNS else store for column, store in zip(columns, setters)]
+    rowType._setters = tuple(setters)
+    rowType._setterOf = dict(zip(columns, setters))
+    return rowType
+
+
+def toDicts(rows) -> list:
+    """
+    Rows as plain dicts, for example to serialize them as json.
+    """
+    return [row.todict() if isinstance(row, compactRow) else dict(row) for row in rows]
+
+
+def toDataFrame(rows):
+    """
+    Rows (dicts or compact rows) as a pandas DataFrame, the columns are taken from the first row.
+    """
+    if pd is None:
+        raise ImportError("toDataFrame requires pandas, install it with: pip install pandas")
+    rows = list(rows)
+    columns = list(rows[0].keys()) if rows else []
+    return pd.DataFrame.from_records([[row.get(col) for col in columns] for row in rows], columns=columns)
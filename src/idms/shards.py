@@ -0,0 +1,224 @@
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import idms.api.contentserver as cs
+from idms.sinks import csvSink, parquetSink
+from idms.visited import visitedSet
+
+SINKS = {"csv": csvSink, "parquet": parquetSink}
+
+# Crawler settings that are copied to the crawlers of the worker processes.
+SHARD_SETTINGS = (
+    "maxCallsPerFolder",
+    "gracefulSleepSeconds",
+    "folderTypes",
+    "folderTypesStopRecursive",
+    "includeParentsPath",
+    "outputColumns",
+    "debugJson",
+    "maxErrorRetry",
+    "prefetch",
+)
+
+
+def crawlerSettings(idms: cs.crawler) -> dict:
+    """
+    Picklable settings of a crawler, the rate limiter and page size tuner are switched on or off like in `idms`.
+    """
+    settings = {name: getattr(idms, name) for name in SHARD_SETTINGS}
+    settings["rateLimiter"] = idms.rateLimiter is not None
+    settings["childrenPageSize"] = idms.childrenPageSize is not None
+    return settings
+
+
+def _crawlShard(options: dict, shard: dict) -> dict:
+    """
+    Crawl one shard into its own file in a worker process, returns its manifest entry.
+    """
+    start = time.time()
+    entry = {"id": shard["id"], "path": shard["path"], "rows": 0, "seconds": 0.0, "status": "done", "error": None}
+    try:
+        idms = cs.crawler(
+            options["baseUrl"],
+            options["username"],
+            options["password"],
+            ticket=options["ticket"],
+            verifySSL=options["verifySSL"],
+            ticketCache=options["ticketCache"],
+            idleTimeout=options["idleTimeout"],
+        )
+        settings = dict(options["settings"])
+        if not settings.pop("rateLimiter"):
+            idms.rateLimiter = None
+        if not settings.pop("childrenPageSize"):
+            idms.childrenPageSize = None
+        for name, value in settings.items():
+            setattr(idms, name, value)
+
+        with SINKS[options["format"]](os.path.join(options["directory"], shard["path"])) as sink:
+            entry["rows"] = idms.children(shard["id"], shard["parents"], shard["stopRecursive"], sink=sink)
+    except Exception as e:
+        logging.warning(f"Shard {shard['id']} failed: {e}")
+        entry["status"] = "error"
+        entry["error"] = str(e)
+    entry["seconds"] = time.time() - start
+    return entry
+
+
+class shardedCrawl:
+    """
+    Crawl a list of start nodes (or the first-level subfolders of the start nodes with `split`) with a pool of
+    `processes` worker processes, so parsing the responses is spread over all cores.
+
+    Every worker has its own session and starts with the ticket of this crawl. With `ticketCache` a ticket that is
+    renewed by one process is picked up by the others. Settings of `self.crawler` (see `SHARD_SETTINGS`) are copied to
+    the workers.
+
+    Each shard is written to its own file (`format` "csv" or "parquet") in the output directory, `manifest.json` lists
+    the files with their rows and status. Running the same crawl again skips the shards that are done.
+
+    Example:
+    sharded = shardedCrawl(baseUrl, idms_username, idms_password, processes=8)
+    manifest = sharded.run([723909139, 723909140], "crawl", split=True)
+    """
+
+    def __init__(
+        self,
+        baseUrl: str,
+        username: str = None,
+        password: str = None,
+        ticket: str = None,
+        verifySSL: bool = True,
+        ticketCache: str = None,
+        processes: int = None,
+        format: str = "csv",
+        idleTimeout: float = 25 * 60,
+    ):
+        if format not in SINKS:
+            raise Exception(f"Unknown shard format {format}, use one of {', '.join(SINKS)}!")
+        self.crawler = cs.crawler(
+            baseUrl, username, password, ticket, verifySSL, ticketCache=ticketCache, idleTimeout=idleTimeout
+        )
+        self.processes = processes or os.cpu_count()
+        self.format = format
+        self._options = {
+            "baseUrl": baseUrl,
+            "username": username,
+            "password": password,
+            "verifySSL": verifySSL,
+            "ticketCache": ticketCache,
+            "idleTimeout": idleTimeout,
+            "format": format,
+        }
+
+    def _shardPath(self, nodeId, suffix: str = "") -> str:
+        return f"shard_{nodeId}{suffix}.{self.format}"
+
+    def _splitNode(self, nodeId, directory: str, visited: visitedSet) -> tuple:
+        """
+        Write the direct children of a node to its own file, returns (manifest entry, shards of its subfolders).
+        """
+        idms = self.crawler
+        start = time.time()
+        parents = idms.ancestorChain(nodeId) if idms.includeParentsPath else cs.parentChain()
+        task = {"id": nodeId, "parents": parents, "stopRecursive": False, "modifyDate": None, "depth": 1}
+        path = self._shardPath(nodeId, "_root")
+        shards = []
+        rows = 0
+        with SINKS[self.format](os.path.join(directory, path)) as sink:
+            for _, dataRows in idms._folderPages(nodeId, parents):
+                for dataRow in dataRows:
+                    sink.write(idms.parseNodeColumns(dataRow, parents))
+                    rows = rows + 1
+                    subfolder = idms._subfolderTask(task, dataRow, None, visited)
+                    if subfolder is not None:
+                        shards.append(
+                            {
+                                "id": subfolder["id"],
+                                "parents": list(subfolder["parents"]),
+                                "stopRecursive": subfolder["stopRecursive"],
+                                "path": self._shardPath(subfolder["id"]),
+                            }
+                        )
+        seconds = time.time() - start
+        return {"id": nodeId, "path": path, "rows": rows, "seconds": seconds, "status": "done", "error": None}, shards
+
+    @staticmethod
+    def readManifest(directory: str) -> dict:
+        try:
+            with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _writeManifest(self, directory: str, entries: list):
+        manifest = {
+            "baseUrl": self.crawler.baseUrl,
+            "format": self.format,
+            "rows": sum(entry["rows"] for entry in entries),
+            "shards": entries,
+        }
+        path = os.path.join(directory, "manifest.json")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+        return manifest
+
+    def run(self, nodeIds: list, directory: str, split: bool = False) -> dict:
+        """
+        Crawl `nodeIds` into `directory` and return the manifest. With `split` the direct children of each start
+        node are crawled here and every subfolder is a shard of its own.
+        """
+        os.makedirs(directory, exist_ok=True)
+        previous = self.readManifest(directory) or {}
+        done = {
+            entry["path"]: entry
+            for entry in previous.get("shards", [])
+            if entry["status"] == "done" and os.path.exists(os.path.join(directory, entry["path"]))
+        }
+
+        # Manifest entries by file, listed in the order of the start nodes and shards.
+        entries = {}
+        shards = []
+        for nodeId in nodeIds:
+            if split:
+                visited = visitedSet()
+                visited.add(nodeId)
+                entry, subfolders = self._splitNode(nodeId, directory, visited)
+                entries[entry["path"]] = entry
+                shards.extend(subfolders)
+            else:
+                shards.append({"id": nodeId, "parents": None, "stopRecursive": False, "path": self._shardPath(nodeId)})
+        order = list(entries) + [shard["path"] for shard in shards]
+
+        todo = []
+        for shard in shards:
+            if shard["path"] in done:
+                entries[shard["path"]] = done[shard["path"]]
+            else:
+                todo.append(shard)
+        logging.info(f"Crawling {len(todo)} shards with {self.processes} processes, {len(shards) - len(todo)} done.")
+
+        options = dict(self._options, ticket=self.crawler.ticket, directory=directory)
+        options["settings"] = crawlerSettings(self.crawler)
+        manifest = self._writeManifest(directory, [entries[path] for path in order if path in entries])
+        if not todo:
+            return manifest
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(self.processes, len(todo)), mp_context=context) as pool:
+            futures = [pool.submit(_crawlShard, options, shard) for shard in todo]
+            try:
+                for future in as_completed(futures):
+                    entry = future.result()
+                    entries[entry["path"]] = entry
+                    manifest = self._writeManifest(directory, [entries[path] for path in order if path in entries])
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return manifest
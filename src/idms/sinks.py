@@ -0,0 +1,299 @@
+import csv
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # pragma: no cover - optional dependency
+    Workbook = None
+
+# Low cardinality columns that are kept dictionary encoded in the buffers (and in Parquet files).
+DICTIONARY_COLUMNS = ("nodeType", "properties.type_name")
+
+
+def scalar(value):
+    """
+    Convert nested values (lists and dicts from `dotfield`) to a json string, so every cell is a scalar.
+    """
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value)
+    return value
+
+
+class columnSink:
+    """
+    Collects crawl rows in column buffers and flushes them per row group, so a crawl never holds more than
+    `rowGroupSize` rows in memory. Subclasses implement `writeGroup` and optionally `finish`.
+
+    Columns are taken from the first row when not given: `downloadUrl`, `viewUrl`, `nodeType`, the `outputColumns`
+    of the crawler and `locationPathString`.
+    """
+
+    def __init__(self, columns: list = None, rowGroupSize: int = 10000, dictionaryColumns: tuple = DICTIONARY_COLUMNS):
+        self.columns = list(columns) if columns else None
+        self.rowGroupSize = rowGroupSize
+        self.dictionaryColumns = dictionaryColumns
+        self.rowCount = 0
+        self._buffers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _initBuffers(self, row: dict):
+        if self.columns is None:
+            self.columns = list(row.keys())
+        self._buffers = {}
+        # Dictionary columns are buffered as codes plus a shared list of distinct values, None stays None.
+        self._dictionaries = {col: ([], {}) for col in self.columns if col in self.dictionaryColumns}
+        self._clearBuffers()
+
+    def _clearBuffers(self):
+        self._buffers = {col: [] for col in self.columns}
+        self._buffered = 0
+
+    def write(self, row: dict):
+        if self._buffers is None:
+            self._initBuffers(row)
+        for col in self.columns:
+            value = scalar(row.get(col))
+            if col in self._dictionaries and value is not None:
+                values, codes = self._dictionaries[col]
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(values)
+                    values.append(value)
+                value = code
+            self._buffers[col].append(value)
+        self._buffered = self._buffered + 1
+        self.rowCount = self.rowCount + 1
+        if self._buffered >= self.rowGroupSize:
+            self.flush()
+
+    def writeRows(self, rows) -> int:
+        """
+        Write all rows of an iterable (for example `crawler.iter_children`), returns the number of rows written.
+        """
+        count = 0
+        for row in rows:
+            self.write(row)
+            count = count + 1
+        return count
+
+    def decoded(self, col: str) -> list:
+        """
+        Values of a buffered column, dictionary columns are decoded to their values.
+        """
+        if col in self._dictionaries:
+            values = self._dictionaries[col][0]
+            return [None if code is None else values[code] for code in self._buffers[col]]
+        return self._buffers[col]
+
+    def flush(self):
+        if self._buffers is not None and self._buffered:
+            self.writeGroup()
+            self._clearBuffers()
+
+    def close(self):
+        self.flush()
+        self.finish()
+
+    def writeGroup(self):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+
+class csvSink(columnSink):
+    """
+    Stream rows to a CSV file, one write per row group.
+    """
+
+    def __init__(self, path: str, columns: list = None, rowGroupSize: int = 10000, delimiter: str = ","):
+        super().__init__(columns, rowGroupSize)
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+        self._header = False
+
+    def writeGroup(self):
+        if not self._header:
+            self.writer.writerow(self.columns)
+            self._header = True
+        self.writer.writerows(zip(*[self.decoded(col) for col in self.columns]))
+
+    def finish(self):
+        self.file.close()
+
+
+class parquetSink(columnSink):
+    """
+    Stream rows to a Parquet file, every flush is a row group. Dictionary columns are written as dictionary arrays.
+
+    The types of a row group are taken from its values. When a later group doesn't fit the file schema (a column that
+    was empty so far, a float in an int column or values of different types) the column is widened: empty to any
+    type, int to float and otherwise to string. The row groups already written are then rewritten with the new
+    schema, values are never truncated. `schema` (a `pyarrow.Schema`) sets the types to start with.
+    """
+
+    def __init__(self, path: str, columns: list = None, rowGroupSize: int = 100000, schema=None):
+        if pa is None:
+            raise ImportError("parquetSink requires pyarrow, install it with: pip install idms[export]")
+        super().__init__(columns, rowGroupSize)
+        self.path = path
+        self.schema = schema
+        self.writer = None
+
+    @staticmethod
+    def _values(values: list):
+        """
+        Arrow array of the values, as strings when they don't fit one type.
+        """
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+    def _array(self, col: str):
+        if col in self._dictionaries:
+            values = self._values(self._dictionaries[col][0])
+            if not pa.types.is_string(values.type):
+                values = values.cast(pa.string())
+            return pa.DictionaryArray.from_arrays(pa.array(self._buffers[col], type=pa.int32()), values)
+        return self._values(self._buffers[col])
+
+    @staticmethod
+    def _cast(array, type):
+        """
+        Array cast to `type` without loss, None when the values don't fit.
+        """
+        if array.type == type:
+            return array
+        try:
+            return array.cast(type, safe=True)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            return None
+
+    @staticmethod
+    def _widen(type, other):
+        """
+        Type that holds the values of both types.
+        """
+        if pa.types.is_null(type):
+            return other
+        if pa.types.is_null(other):
+            return type
+        if pa.types.is_integer(type) and pa.types.is_integer(other):
+            return pa.int64()
+        if (pa.types.is_integer(type) or pa.types.is_floating(type)) and (
+            pa.types.is_integer(other) or pa.types.is_floating(other)
+        ):
+            return pa.float64()
+        return pa.string()
+
+    def _conform(self, arrays: list, schema) -> tuple:
+        """
+        Cast the arrays of a row group to the schema, widening the columns that don't fit. Returns (arrays, schema).
+        """
+        conformed = []
+        for i, (field, array) in enumerate(zip(schema, arrays)):
+            cast = self._cast(array, field.type)
+            if cast is None:
+                type = self._widen(field.type, array.type)
+                cast = self._cast(array, type)
+                if cast is None:
+                    type = pa.string()
+                    cast = array.cast(type)
+                schema = schema.set(i, pa.field(field.name, type))
+            conformed.append(cast)
+        return conformed, schema
+
+    def _rewrite(self, schema):
+        """
+        Write the row groups written so far again with a wider schema. Returns the schema, which is widened further
+        when old values don't fit it.
+        """
+        self.writer.close()
+        tmp = f"{self.path}.tmp"
+        os.replace(self.path, tmp)
+        with open(tmp, "rb") as f:
+            source = pq.ParquetFile(f)
+            while True:
+                self.writer = pq.ParquetWriter(self.path, schema)
+                for i in range(source.num_row_groups):
+                    table = source.read_row_group(i)
+                    arrays, widened = self._conform([table.column(field.name) for field in schema], schema)
+                    if widened != schema:
+                        break
+                    self.writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                else:
+                    break
+                self.writer.close()
+                schema = widened
+        os.remove(tmp)
+        return schema
+
+    def writeGroup(self):
+        arrays = [self._array(col) for col in self.columns]
+        schema = self.schema
+        if schema is None:
+            schema = pa.schema([pa.field(col, a.type) for col, a in zip(self.columns, arrays)])
+        arrays, widened = self._conform(arrays, schema)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, widened)
+        elif widened != self.schema:
+            widened = self._rewrite(widened)
+            arrays, widened = self._conform(arrays, widened)
+        self.schema = widened
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def finish(self):
+        if self.writer is None and self.columns:
+            pq.write_table(pa.schema([pa.field(col, pa.string()) for col in self.columns]).empty_table(), self.path)
+        elif self.writer is not None:
+            self.writer.close()
+
+
+class excelSink(columnSink):
+    """
+    Stream rows to an Excel file with an openpyxl write-only workbook, rows are appended per row group and a new
+    sheet is started when a sheet is full.
+    """
+
+    maxSheetRows = 1048575
+
+    def __init__(self, path: str, columns: list = None, rowGroupSize: int = 10000, sheetName: str = "results"):
+        if Workbook is None:
+            raise ImportError("excelSink requires openpyxl, install it with: pip install idms[export]")
+        super().__init__(columns, rowGroupSize)
+        self.path = path
+        self.sheetName = sheetName
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self._sheetRows = 0
+
+    def _newSheet(self):
+        number = len(self.workbook.worksheets) + 1
+        self.sheet = self.workbook.create_sheet(self.sheetName if number == 1 else f"{self.sheetName}_{number}")
+        self.sheet.append(self.columns)
+        self._sheetRows = 0
+
+    def writeGroup(self):
+        for values in zip(*[self.decoded(col) for col in self.columns]):
+            if self.sheet is None or self._sheetRows >= self.maxSheetRows:
+                self._newSheet()
+            self.sheet.append(values)
+            self._sheetRows = self._sheetRows + 1
+
+    def finish(self):
+        if self.sheet is None:
+            self.workbook.create_sheet(self.sheetName).append(self.columns or [])
+        self.workbook.save(self.path)
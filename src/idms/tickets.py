@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+class ticketManager:
+    """
+    Keeps the otcsticket of a crawler valid and shared by all its worker threads.
+
+    authorize: function that logs in and returns a new ticket, None when no credentials are known.
+    cachePath: json file to reuse tickets across processes, only readable for the current user. Tickets are stored per
+    sha256 of `cacheKey` (base url and username), the password is never stored.
+    idleTimeout: seconds after the last use that a ticket is considered expired (Content Server default: 30 minutes).
+    Only used when `authorize` is set, a ticket without credentials is sent until the server rejects it.
+
+    A ticket that is rejected (401) is refreshed with `refresh(staleTicket)`: the first worker logs in again, the
+    others get the new ticket without logging in. With `cachePath` this includes other processes that share the file.
+    """
+
+    def __init__(
+        self,
+        authorize=None,
+        cachePath: str = None,
+        cacheKey: str = "",
+        idleTimeout: float = 25 * 60,
+        clock=time.time,
+    ):
+        self.authorize = authorize
+        self.cachePath = cachePath
+        self.cacheKey = hashlib.sha256(cacheKey.encode("utf-8")).hexdigest()
+        self.idleTimeout = idleTimeout
+        self.clock = clock
+        self.refreshes = 0
+
+        self._ticket = None
+        self._used = 0.0
+        self._saved = 0.0
+        self._lock = threading.RLock()
+        if cachePath:
+            self._load()
+
+    def get(self) -> str:
+        """
+        A valid ticket, logs in when there is no ticket yet or when it is idle for more then `idleTimeout`.
+        """
+        ticket = self._ticket
+        expired = self.authorize is not None and self.clock() - self._used > self.idleTimeout
+        if ticket is None or expired:
+            ticket = self.refresh(ticket)
+        self._used = self.clock()
+        if self.cachePath and self._used - self._saved > 60:
+            self._save()
+        return ticket
+
+    def set(self, ticket: str):
+        """
+        Use a known ticket, for example given by the user or renewed by the server.
+        """
+        if ticket and ticket != self._ticket:
+            self._ticket = ticket
+            self._used = self.clock()
+            if self.cachePath:
+                self._save()
+
+    def refresh(self, staleTicket: str = None) -> str:
+        """
+        Log in again unless the ticket was already renewed since `staleTicket` was handed out.
+        """
+        with self._lock:
+            if self._ticket is not None and self._ticket != staleTicket:
+                return self._ticket
+            # Another process may have renewed the ticket already.
+            if self.cachePath:
+                self._load()
+                if self._ticket is not None and self._ticket != staleTicket:
+                    return self._ticket
+            if self.authorize is None:
+                raise Exception("Ticket expired and no username and password to log in again!")
+            logging.info("Requesting a new ticket.")
+            self._ticket = self.authorize()
+            self._used = self.clock()
+            self.refreshes = self.refreshes + 1
+            if self.cachePath:
+                self._save()
+            return self._ticket
+
+    def _load(self):
+        try:
+            with open(self.cachePath, encoding="utf-8") as f:
+                entry = json.load(f).get(self.cacheKey)
+        except (OSError, ValueError):
+            return
+        if entry and self.clock() - entry.get("used", 0) <= self.idleTimeout:
+            self._ticket = entry["ticket"]
+            self._used = entry["used"]
+            self._saved = entry["used"]
+
+    def _save(self):
+        """
+        Write the ticket to the cache file (mode 600), keeping the tickets of other keys.
+        """
+        with self._lock:
+            try:
+                with open(self.cachePath, encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            now = self.clock()
+            entries = {key: e for key, e in entries.items() if now - e.get("used", 0) <= self.idleTimeout}
+            entries[self.cacheKey] = {"ticket": self._ticket, "used": self._used}
+            directory = os.path.dirname(os.path.abspath(self.cachePath))
+            os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.cachePath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.cachePath)
+            self._saved = now
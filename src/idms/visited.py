@@ -0,0 +1,72 @@
+from array import array
+from bisect import bisect_left
+
+
+class visitedSet:
+    """
+    Set of integer node ids kept in blocks of `blockBits` ids, like a roaring bitmap. A block holds the sorted offsets
+    of its ids in an array until the array would be larger than a bitmap of the block (8 KiB by default), then it is
+    converted to a bitmap. Content Server ids are large and spread out, so most blocks hold a few ids and take a few
+    bytes per id. Adding an id that is already in the set counts as a duplicate.
+
+    Example:
+    visited = visitedSet()
+    visited.add(2000) -> True
+    visited.add("2000") -> False, visited.duplicates -> 1
+    """
+
+    def __init__(self, blockBits: int = 65536):
+        self.blockBits = blockBits
+        self.duplicates = 0
+        self._typecode = "H" if blockBits <= 1 << 16 else "I"
+        # Blocks with more offsets than this are kept as bitmap.
+        self._maxOffsets = blockBits // (8 * array(self._typecode).itemsize)
+        self._blocks = {}
+        self._length = 0
+
+    def add(self, nodeId) -> bool:
+        """
+        Add a node id, returns False (and counts a duplicate) when it was already added.
+        """
+        block, bit = divmod(int(nodeId), self.blockBits)
+        ids = self._blocks.get(block)
+        if ids is None:
+            self._blocks[block] = array(self._typecode, (bit,))
+        elif type(ids) is array:
+            i = bisect_left(ids, bit)
+            if i < len(ids) and ids[i] == bit:
+                self.duplicates = self.duplicates + 1
+                return False
+            if len(ids) < self._maxOffsets:
+                ids.insert(i, bit)
+            else:
+                bits = self._blocks[block] = bytearray(self.blockBits // 8)
+                for offset in ids:
+                    bits[offset >> 3] = bits[offset >> 3] | (1 << (offset & 7))
+                bits[bit >> 3] = bits[bit >> 3] | (1 << (bit & 7))
+        else:
+            mask = 1 << (bit & 7)
+            if ids[bit >> 3] & mask:
+                self.duplicates = self.duplicates + 1
+                return False
+            ids[bit >> 3] = ids[bit >> 3] | mask
+        self._length = self._length + 1
+        return True
+
+    def __contains__(self, nodeId) -> bool:
+        block, bit = divmod(int(nodeId), self.blockBits)
+        ids = self._blocks.get(block)
+        if ids is None:
+            return False
+        if type(ids) is array:
+            i = bisect_left(ids, bit)
+            return i < len(ids) and ids[i] == bit
+        return bool(ids[bit >> 3] & (1 << (bit & 7)))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def clear(self):
+        self._blocks.clear()
+        self._length = 0
+        self.duplicates = 0
@@ -0,0 +1,238 @@
+import datetime
+import sqlite3
+import time
+
+from idms.api.contentserver import dotfield, parentChain
+
+
+class folderWatch:
+    """
+    Poll folders for added, changed and removed nodes without crawling them again.
+
+    Each folder is listed sorted on `modify_date` descending and paging stops at the first node older than the newest
+    node seen in the previous poll, so a poll of a quiet folder costs one request. Only subfolders of which the
+    `modify_date` moved are listed too. Per folder the newest `modify_date` (the checkpoint) and the id and
+    `modify_date` of every child are kept in a SQLite file, committed after the events of a folder are yielded.
+
+    The first poll lists the whole tree to set the checkpoints, with `emitInitial` every node is reported as added.
+    """
+
+    SORT = "desc_modify_date"
+
+    def __init__(self, crawler, folderIds: list, path: str = "idms_watch.sqlite", emitInitial: bool = False):
+        self.crawler = crawler
+        self.folderIds = [int(folderId) for folderId in folderIds]
+        self.emitInitial = emitInitial
+        self.pageSize = 100
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS folders (
+                id INTEGER PRIMARY KEY,
+                modify_date TEXT,
+                newest TEXT,
+                polled_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS nodes (
+                id INTEGER PRIMARY KEY,
+                folder_id INTEGER NOT NULL,
+                type INTEGER,
+                name TEXT,
+                modify_date TEXT
+            );
+            CREATE INDEX IF NOT EXISTS nodes_folder ON nodes (folder_id);
+            """
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def folder(self, folderId) -> dict:
+        """
+        Checkpoint of a folder or None: {"modify_date": str, "newest": str, "polled_at": str}
+        """
+        row = self.connection.execute(
+            "SELECT modify_date, newest, polled_at FROM folders WHERE id = ?", (int(folderId),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"modify_date": row[0], "newest": row[1], "polled_at": row[2]}
+
+    def _children(self, folderId) -> dict:
+        """
+        Known children of a folder as {id: (type, modify_date, name)}.
+        """
+        rows = self.connection.execute(
+            "SELECT id, type, modify_date, name FROM nodes WHERE folder_id = ?", (int(folderId),)
+        ).fetchall()
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+    def _prune(self):
+        """
+        Remove the checkpoints of folders that are no longer a known child (removed folders) and of the folders below
+        them. A folder that was moved to another watched folder keeps its checkpoint.
+        """
+        while True:
+            orphans = [
+                row[0]
+                for row in self.connection.execute("SELECT id FROM folders WHERE id NOT IN (SELECT id FROM nodes)")
+                if row[0] not in self.folderIds
+            ]
+            if not orphans:
+                break
+            for folderId in orphans:
+                self.connection.execute("DELETE FROM nodes WHERE folder_id = ?", (folderId,))
+                self.connection.execute("DELETE FROM folders WHERE id = ?", (folderId,))
+        self.connection.commit()
+
+    def _watched(self, nodeType) -> bool:
+        """
+        Whether subfolders of this type are polled. Subfolders of a collection hold references, like `children`
+        doesn't crawl them they are not watched.
+        """
+        return nodeType in self.crawler.folderTypes and nodeType not in self.crawler.folderTypesStopRecursive
+
+    def _listing(self, folderId, checkpoint: str = None) -> tuple:
+        """
+        Children of a folder newest first, down to the first node older than `checkpoint` (all without checkpoint).
+        Returns (data rows, number of children the server reports or None, whether all children were listed).
+        """
+        dataRows = []
+        page = 1
+        while True:
+            data = self.crawler._fetchChildrenPage(folderId, page, self.pageSize, sort=self.SORT)
+            total = dotfield(data, "collection.paging.total_count")
+            for result in data.get("results", []):
+                dataRow = result.get("data", result)
+                modifyDate = ((dataRow or {}).get("properties") or {}).get("modify_date")
+                if checkpoint and modifyDate and modifyDate < checkpoint:
+                    return dataRows, total, False
+                dataRows.append(dataRow)
+            if page >= (dotfield(data, "collection.paging.page_total", 0) or 0):
+                return dataRows, total, True
+            page = page + 1
+
+    def _pollFolder(self, folderId: int, parents: parentChain, modifyDate: str, emit: bool) -> tuple:
+        """
+        Poll one folder, with `emit` the changes are returned as events. Returns (events, subfolders to poll as
+        (id, parents, modify_date, emit)).
+        """
+        state = self.folder(folderId)
+        known = self._children(folderId)
+        initial = state is None
+        dataRows, total, complete = self._listing(folderId, None if initial else state["newest"])
+
+        events = []
+        subfolders = []
+        newest = None if initial else state["newest"]
+        listed = set()
+
+        def handle(dataRows: list):
+            nonlocal newest
+            for dataRow in dataRows:
+                properties = (dataRow or {}).get("properties") or {}
+                nodeId = int(properties["id"])
+                if nodeId in listed:
+                    continue
+                nodeType = properties.get("type")
+                nodeModifyDate = properties.get("modify_date")
+                listed.add(nodeId)
+                if nodeModifyDate and (newest is None or nodeModifyDate > newest):
+                    newest = nodeModifyDate
+
+                event = None
+                if nodeId not in known:
+                    event = "added"
+                elif known[nodeId][1] != nodeModifyDate:
+                    event = "changed"
+                if event is not None:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO nodes (id, folder_id, type, name, modify_date) VALUES (?, ?, ?, ?, ?)",
+                        (nodeId, folderId, nodeType, properties.get("name"), nodeModifyDate),
+                    )
+                    if emit:
+                        row = self.crawler.parseNodeColumns(dataRow, parents)
+                        events.append({"event": event, "id": nodeId, "folderId": folderId, "row": row})
+
+                if self._watched(nodeType):
+                    subfolder = self.folder(nodeId)
+                    if subfolder is None or subfolder["modify_date"] != nodeModifyDate:
+                        entry = self.crawler._parentEntry(dataRow)
+                        subfolders.append((nodeId, parents.append(entry), nodeModifyDate, emit))
+
+        handle(dataRows)
+
+        # The server count tells whether children were removed: all children changed since the checkpoint are listed,
+        # so without removals the count equals the known plus the listed children. Otherwise the folder is listed
+        # again in full, children with an older `modify_date` (moved in, restored or copied) are added from it.
+        if not complete and (total is None or total != len(listed.union(known))):
+            handle(self._listing(folderId)[0])
+            complete = True
+        removed = set(known) - listed if complete else set()
+        for nodeId in removed:
+            # A node moved to a folder that was polled before belongs to that folder now.
+            deleted = self.connection.execute("DELETE FROM nodes WHERE id = ? AND folder_id = ?", (nodeId, folderId))
+            if not deleted.rowcount:
+                continue
+            if emit:
+                events.append({"event": "removed", "id": nodeId, "folderId": folderId, "row": None})
+
+        # Known subfolders without checkpoint were not polled yet when an earlier (first) poll stopped.
+        for nodeId, (nodeType, nodeModifyDate, name) in known.items():
+            if nodeId in listed or nodeId in removed or not self._watched(nodeType) or self.folder(nodeId) is not None:
+                continue
+            entry = {"id": nodeId, "name": name, "parent_id": folderId, "type": nodeType}
+            subfolders.append((nodeId, parents.append(entry), nodeModifyDate, self.emitInitial))
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO folders (id, modify_date, newest, polled_at) VALUES (?, ?, ?, ?)",
+            (folderId, modifyDate, newest, datetime.datetime.now().isoformat()),
+        )
+        return events, subfolders
+
+    def poll(self):
+        """
+        Yield the changes since the previous poll as {"event": "added"|"changed"|"removed", "id", "folderId", "row"}.
+        `row` is the row of `crawler.parseNodeColumns` (None for removed nodes). The checkpoint of a folder is
+        committed after its events were consumed, an interrupted poll reports the remaining changes next time.
+        """
+        for folderId in self.folderIds:
+            state = self.folder(folderId)
+            parents = self.crawler.ancestorChain(folderId) if self.crawler.includeParentsPath else parentChain()
+            # The first poll sets the checkpoints, folders found in later polls report their children as added.
+            emit = self.emitInitial or state is not None
+            stack = [(folderId, parents, state["modify_date"] if state else None, emit)]
+            while stack:
+                nodeId, chain, modifyDate, emit = stack.pop()
+                try:
+                    events, subfolders = self._pollFolder(nodeId, chain, modifyDate, emit)
+                    for event in events:
+                        yield event
+                except BaseException:
+                    # A failed request or a consumer that stops: the folder is polled again next time.
+                    self.connection.rollback()
+                    raise
+                self.connection.commit()
+                stack.extend(reversed(subfolders))
+        self._prune()
+
+    def watch(self, interval: float = 300.0, polls: int = None):
+        """
+        Poll every `interval` seconds (forever, or `polls` times) and yield the events.
+        """
+        count = 0
+        while polls is None or count < polls:
+            started = time.monotonic()
+            for event in self.poll():
+                yield event
+            count = count + 1
+            if polls is None or count < polls:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
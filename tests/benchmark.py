@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the crawler against a local mock Content Server (see `tests.mockserver`), no iDMS needed.
+Reports rows (nodes) per second, requests per second and peak memory (tracemalloc, measured in a second run).
+
+Example:
+python -m tests.benchmark --depth 4 --width 4 --documents 200 --latency 0.002 --json bench.json
+"""
+
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+import idms.api.contentserver as cs
+from idms.journal import crawlJournal
+from tests.mockserver import fakeTree, mockContentServer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the idms crawler against a local mock Content Server")
+    parser.add_argument("--depth", type=int, default=4, help="Folder levels of the synthetic tree")
+    parser.add_argument("--width", type=int, default=4, help="Subfolders per folder")
+    parser.add_argument("--documents", type=int, default=200, help="Documents per folder")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--errorRate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--workers", type=int, default=8, help="Workers of children_concurrent")
+    parser.add_argument("--searchLimit", type=int, default=None, help="Rows per search page (default: adaptive)")
+    parser.add_argument("--noRateLimit", action="store_true", help="Switch off the adaptive rate limiter of the crawler")
+    parser.add_argument("--noMemory", action="store_true", help="Skip the peak memory runs")
+    parser.add_argument("--json", type=str, help="Write the results to this json file")
+    parser.add_argument("--verbose", action="store_true", help="increase output verbosity")
+    return parser.parse_args()
+
+
+def benchmarks(idms: cs.crawler, args) -> dict:
+    return {
+        "children": lambda: idms.children(2000),
+        "children_bfs": lambda: idms.children(2000, order="bfs"),
+        "children_concurrent": lambda: idms.children_concurrent(2000, workers=args.workers),
+        "search": lambda: idms.search("benchmark", limit=args.searchLimit, resume_last_position=False),
+    }
+
+
+def measure(name: str, run, server: mockContentServer, memory: bool = True) -> dict:
+    requests = server.requests
+    start = time.perf_counter()
+    rows = len(run())
+    seconds = time.perf_counter() - start
+    requests = server.requests - requests
+    result = {
+        "name": name,
+        "rows": rows,
+        "requests": requests,
+        "seconds": round(seconds, 3),
+        "rowsPerSecond": round(rows / seconds, 1),
+        "requestsPerSecond": round(requests / seconds, 1),
+        "peakMemoryMB": None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            result["peakMemoryMB"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    tree = fakeTree(args.depth, args.width, args.documents)
+    print(f"Tree: {len(tree)} folders, {sum(len(children) for children in tree.values())} nodes")
+
+    results = []
+    with mockContentServer(tree, latency=args.latency, errorRate=args.errorRate, errorStatus=429, seed=1) as server:
+        idms = cs.crawler(server.url, "benchmark", "benchmark")
+        idms.debugJson = False
+        idms._searchJournal = crawlJournal(":memory:")
+        if args.noRateLimit:
+            idms.rateLimiter = None
+        for name, run in benchmarks(idms, args).items():
+            result = measure(name, run, server, not args.noMemory)
+            results.append(result)
+            print(
+                f"{name:<22} {result['rows']:>8} rows {result['seconds']:>8.2f} s "
+                f"{result['rowsPerSecond']:>10.1f} rows/s {result['requestsPerSecond']:>8.1f} req/s "
+                f"peak {result['peakMemoryMB']} MB"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"arguments": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
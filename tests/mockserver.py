@@ -0,0 +1,198 @@
+import datetime
+import http.server
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+
+MIME_TYPES = ("application/pdf", "application/msword", "image/png")
+
+
+def fakeTree(depth: int = 3, width: int = 3, documents: int = 150) -> dict:
+    """
+    Build a synthetic folder tree as {nodeId: [child nodes]}.
+    """
+    tree = {}
+    nextId = [2000]
+
+    def node(parentId: int, nodeType: int) -> dict:
+        nextId[0] = nextId[0] + 1
+        modified = datetime.datetime(2020, 1, 1) + datetime.timedelta(days=nextId[0] % 365)
+        properties = {"id": nextId[0], "parent_id": parentId, "type": nodeType, "name": f"n{nextId[0]}"}
+        properties["modify_date"] = modified.strftime("%Y-%m-%dT%H:%M:%S")
+        if nodeType == 144:
+            properties["size"] = 1000 + nextId[0] % 1000
+            properties["mime_type"] = MIME_TYPES[nextId[0] % len(MIME_TYPES)]
+        return {"properties": properties}
+
+    def fill(nodeId: int, level: int):
+        tree[nodeId] = [node(nodeId, 144) for _ in range(documents)]
+        if level < depth:
+            for _ in range(width):
+                folder = node(nodeId, 0)
+                tree[nodeId].append(folder)
+                fill(folder["properties"]["id"], level + 1)
+                # Like Content Server the size of a folder is its number of items.
+                folder["properties"].update(container=True, container_size=len(tree[folder["properties"]["id"]]))
+                folder["properties"]["size"] = folder["properties"]["container_size"]
+
+    fill(2000, 1)
+    return tree
+
+
+def fakeData(tree: dict, url: str, data: dict = None) -> dict:
+    """
+    Response body of the ancestors, children and search endpoints for a fake tree.
+    Search matches all nodes of the tree.
+    """
+    if url.endswith("/api/v2/search"):
+        nodes = [n for children in tree.values() for n in children]
+        dateRange = re.search(r'QLRANGE "(\d+)~(\d+)"', data["where"])
+        if dateRange:
+            start, end = dateRange.groups()
+            nodes = [n for n in nodes if start <= n["properties"]["modify_date"][:10].replace("-", "") <= end]
+        limit, page = int(data["limit"]), int(data.get("page", 1))
+        paging = {"total_count": len(nodes)}
+        if page * limit < len(nodes):
+            paging["links"] = {"next": {"href": f"/api/v2/search?limit={limit}&page={page + 1}"}}
+        return {
+            "collection": {"paging": paging},
+            "results": [
+                {"data": n, "links": {"ancestors": [{"name": "Enterprise"}]}}
+                for n in nodes[(page - 1) * limit : page * limit]
+            ],
+        }
+    if url.endswith("/ancestors"):
+        return {"ancestors": [{"name": "Enterprise"}]}
+    nodeId, limit, page = [int(v) for v in re.search(r"nodes/(\d+)/nodes\?limit=(\d+)&page=(\d+)", url).groups()]
+    nodes = tree.get(nodeId, [])
+    if "sort=desc_modify_date" in url:
+        nodes = sorted(nodes, key=lambda n: n["properties"].get("modify_date") or "", reverse=True)
+    return {
+        "collection": {"paging": {"page_total": (len(nodes) + limit - 1) // limit, "total_count": len(nodes)}},
+        "results": [{"data": n} for n in nodes[(page - 1) * limit : page * limit]],
+    }
+
+
+class mockContentServer:
+    """
+    Local http server that emulates the Content Server REST API for a fake tree (see `fakeTree`): /api/v1/auth,
+    /api/v1/nodes/{id}/ancestors, /api/v2/nodes/{id}/nodes, /api/v2/search and /api/v2/nodes/{id}/content.
+
+    latency: seconds added to every response.
+    errorRate: fraction of the requests (after auth) answered with `errorStatus`.
+
+    Example:
+    with mockContentServer(fakeTree(depth=4, width=5)) as server:
+        idms = cs.crawler(server.url, "user", "password")
+        rows = idms.children(2000)
+    """
+
+    def __init__(
+        self, tree: dict, latency: float = 0.0, errorRate: float = 0.0, errorStatus: int = 503, seed: int = None
+    ):
+        self.tree = tree
+        self.latency = latency
+        self.errorRate = errorRate
+        self.errorStatus = errorStatus
+        self.random = random.Random(seed)
+        self.sizes = {n["properties"]["id"]: n["properties"].get("size") or 0 for n in sum(tree.values(), [])}
+        self.requests = 0
+        self.errors = 0
+        self.auths = 0
+        self.tickets = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        mock = self
+
+        class handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                mock.handle(self)
+
+            def do_POST(self):
+                mock.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def expireTickets(self):
+        """
+        Reject all tickets handed out so far (401), as after a session timeout.
+        """
+        with self._lock:
+            self.tickets.clear()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle(self, request: http.server.BaseHTTPRequestHandler):
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length).decode("utf-8") if length else ""
+        data = {key: values[-1] for key, values in urllib.parse.parse_qs(body).items()}
+        path = request.path
+        with self._lock:
+            self.requests = self.requests + 1
+            error = self.errorRate and self.random.random() < self.errorRate
+            if error:
+                self.errors = self.errors + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if path == "/api/v1/auth":
+            if data.get("username") and data.get("password"):
+                with self._lock:
+                    self.auths = self.auths + 1
+                    ticket = f"mockticket{self.auths}"
+                    self.tickets.add(ticket)
+                return self.respond(request, 200, {"ticket": ticket})
+            return self.respond(request, 401, {"error": "Invalid username or password"})
+        if request.headers.get("otcsticket") not in self.tickets:
+            return self.respond(request, 401, {"error": "Session has expired"})
+        if error:
+            return self.respond(request, self.errorStatus, {"error": "Injected error"})
+
+        content = re.search(r"/api/v2/nodes/(\d+)/content", path)
+        if content:
+            size = self.sizes.get(int(content.group(1)), 0)
+            start = int((request.headers.get("Range") or "bytes=0-")[6:].split("-")[0])
+            payload = bytes(i % 251 for i in range(start, size))
+            return self.respond(request, 206 if start else 200, payload, "application/octet-stream")
+        return self.respond(request, 200, fakeData(self.tree, urllib.parse.urlsplit(path).path if data else path, data))
+
+    @staticmethod
+    def respond(request: http.server.BaseHTTPRequestHandler, status: int, body, contentType: str = "application/json"):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", contentType)
+        request.send_header("Content-Length", str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
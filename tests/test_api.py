@@ -2,15 +2,330 @@
 # testing in general, but rather to support the `find_packages` example in
 # setup.py that excludes installing the "tests" package
 
+import datetime
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
 
 import idms.api.contentserver as cs
+from idms.journal import crawlJournal
+from idms.visited import visitedSet
+from tests.mockserver import fakeData, fakeTree
+
+
+class FakeResponse:
+    def __init__(self, data: dict):
+        self.data = data
+        self.content = json.dumps(data).encode("utf-8")
+        self.elapsed = datetime.timedelta(milliseconds=len(data.get("results", [])))
+
+    def json(self) -> dict:
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def fakeCrawler(tree: dict) -> cs.crawler:
+    idms = cs.crawler("http://localhost", ticket="ticket")
+    idms.debugJson = False
+    idms._searchJournal = crawlJournal(":memory:")
+    idms._request = lambda method, url, **kwargs: FakeResponse(fakeData(tree, url, kwargs.get("data")))
+    return idms
 
 
 class TestContentServer(unittest.TestCase):
     def test_object_init(self):
         self.assertTrue(isinstance(cs.crawler, object))
 
+    def test_children_concurrent_same_rows(self):
+        idms = fakeCrawler(fakeTree())
+        expected = idms.children(2000)
+        self.assertEqual(len(expected), 13 * 150 + 12)
+        self.assertEqual(idms.children_concurrent(2000, workers=4), expected)
+
+    def test_children_order_depth_and_limits(self):
+        tree = fakeTree(depth=3, width=3, documents=150)
+        idms = fakeCrawler(tree)
+        depths = {2000: 0}
+        for nodeId in tree:
+            for n in tree[nodeId]:
+                depths[n["properties"]["id"]] = depths[nodeId] + 1
+
+        expected = idms.children(2000)
+        bfs = idms.children(2000, order="bfs")
+        self.assertEqual(sorted(r["properties.id"] for r in bfs), sorted(r["properties.id"] for r in expected))
+        levels = [depths[r["properties.id"]] for r in bfs]
+        self.assertEqual(levels, sorted(levels))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            idms.frontierMemoryLimit = 2
+            idms.frontierDirectory = tmp
+            self.assertEqual(idms.children(2000, order="bfs"), bfs)
+            self.assertEqual(os.listdir(tmp), [])
+        idms.frontierMemoryLimit = 10000
+        idms.frontierDirectory = None
+
+        self.assertEqual(len(idms.children(2000, maxDepth=1)), 153)
+        self.assertEqual(len(idms.children(2000, order="bfs", maxDepth=2)), 4 * 150 + 12)
+        self.assertEqual(idms.children(2000, maxNodes=500), expected[:500])
+
+        # A chain of folders deeper than the recursion limit.
+        deep = {nodeId: [{"properties": {"id": nodeId + 1, "type": 0, "name": "map"}}] for nodeId in range(2000, 3500)}
+        self.assertEqual(len(fakeCrawler(deep).children(2000)), 1500)
+
+    def test_children_visited_folders(self):
+        tree = fakeTree(depth=3, width=2, documents=5)
+        folders = [n for n in tree[2000] if n["properties"]["type"] == 0]
+        # A collection listed first that holds a folder of the tree, the start node itself and its own subfolder.
+        collection = {"properties": {"id": 9000, "type": 298, "name": "collectie"}}
+        tree[2000].insert(0, collection)
+        tree[9000] = [folders[0], {"properties": {"id": 2000, "type": 0, "name": "start"}}]
+        tree[9000].append({"properties": {"id": 9001, "type": 0, "name": "map in collectie"}})
+        tree[9001] = [{"properties": {"id": 9002, "type": 144, "name": "doc"}}]
+
+        idms = fakeCrawler(tree)
+        urls = []
+        request = idms._request
+        idms._request = lambda method, url, **kwargs: urls.append(url) or request(method, url, **kwargs)
+
+        def fetched() -> list:
+            nodeIds = [int(re.search(r"nodes/(\d+)/nodes", url).group(1)) for url in urls if "/nodes?" in url]
+            urls.clear()
+            return nodeIds
+
+        # Subfolders of the collection are not crawled, the folders after it are.
+        rows = idms.children(2000)
+        self.assertEqual(sorted(fetched()), sorted(set(tree) - {9001}))
+        self.assertEqual(len(rows), sum(len(tree[nodeId]) for nodeId in tree if nodeId != 9001))
+        self.assertEqual(idms.children_concurrent(2000), rows)
+        fetched()
+
+        # Crawling through collections, the start node and folders[0] are reached twice but fetched once.
+        idms.folderTypesStopRecursive = []
+        idms.visited = visitedSet()
+        rows = idms.children(2000)
+        self.assertEqual(sorted(fetched()), sorted(tree))
+        self.assertEqual(len(rows), sum(len(children) for children in tree.values()))
+        self.assertEqual(idms.visited.duplicates, 2)
+
+        # Overlapping start nodes share the visited set.
+        self.assertEqual(idms.children(folders[1]["properties"]["id"]), [])
+        self.assertEqual(idms.children_concurrent(2000), [])
+        self.assertEqual((fetched(), idms.visited.duplicates), ([], 4))
+
+        idms.visited = None
+        concurrent = idms.children_concurrent(2000)
+        self.assertEqual(sorted(r["properties.id"] for r in concurrent), sorted(r["properties.id"] for r in rows))
+        self.assertEqual(len(idms.children(2000, order="bfs")), len(rows))
+
+        visited = visitedSet(blockBits=64)
+        self.assertTrue(visited.add(-5))
+        self.assertTrue(visited.add(130))
+        self.assertFalse(visited.add("130"))
+        self.assertIn(-5, visited)
+        self.assertNotIn(129, visited)
+        self.assertEqual((len(visited), visited.duplicates), (2, 1))
+
+    def test_visited_set_memory(self):
+        def traced(build):
+            tracemalloc.start()
+            try:
+                result = build()
+                size = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            return result, size
+
+        def fill(nodeIds: list) -> visitedSet:
+            visited = visitedSet()
+            for nodeId in nodeIds:
+                visited.add(nodeId)
+            return visited
+
+        # Content Server ids are large and spread out.
+        nodeIds = random.Random(1).sample(range(700000000), 50000)
+        visited, visitedSize = traced(lambda: fill(nodeIds))
+        plain, setSize = traced(lambda: set(nodeIds))
+        self.assertEqual(len(visited), len(plain))
+        self.assertTrue(all(n in visited for n in nodeIds[:1000]))
+        self.assertLess(visitedSize, setSize)
+
+        # Dense blocks are converted to a bitmap.
+        dense = visitedSet(blockBits=256)
+        self.assertTrue(all(dense.add(n) for n in range(0, 1000, 3)))
+        self.assertFalse(any(dense.add(n) for n in range(0, 1000, 3)))
+        self.assertEqual([n for n in range(1000) if n in dense], list(range(0, 1000, 3)))
+        self.assertEqual((len(dense), dense.duplicates), (334, 334))
+
+    def test_iter_search_by_page(self):
+        idms = fakeCrawler(fakeTree(depth=2, width=2, documents=20))
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                pages = list(idms.iter_search("test", limit=25, by_page=True))
+                rows = idms.search("test", limit=25, resume_last_position=False)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual([len(p) for p in pages], [25, 25, 12])
+        self.assertEqual([r for p in pages for r in p], rows)
+        self.assertEqual(rows[0]["locationPathString"], "Enterprise")
+
+    def test_search_parallel_splits_date_shards(self):
+        tree = fakeTree(depth=2, width=3, documents=100)
+        idms = fakeCrawler(tree)
+        posts = []
+        request = idms._request
+        idms._request = lambda method, url, **kwargs: posts.append(kwargs["data"]) or request(method, url, **kwargs)
+
+        dateRange = (datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+        rows = idms.search_parallel("test", dateRange=dateRange, workers=4, limit=50, maxShardResults=60)
+        expected = sorted(n["properties"]["id"] for children in tree.values() for n in children)
+        self.assertEqual(sorted(r["properties.id"] for r in rows), expected)
+        self.assertGreater(len({p["where"] for p in posts}), 4)
+
+        rows = idms.search_parallel("test", slices=["1", "2"], workers=2, limit=50)
+        self.assertEqual(len(rows), 403)
+
+    def test_search_many_merges_hits(self):
+        tree = fakeTree(depth=2, width=3, documents=100)
+        idms = fakeCrawler(tree)
+        queries = [
+            'a [QLRANGE "20200101~20200630"]',
+            'b [QLRANGE "20200401~20201231"]',
+            'c [QLRANGE "20200501~20200531"]',
+            'a [QLRANGE "20200101~20200630"]',
+        ]
+        rows = idms.search_many(queries, workers=3, limit=40)
+
+        sequential = [row for query in queries[:3] for row in idms.search(query, limit=40)]
+        expected = {}
+        for row in sequential:
+            expected.setdefault(row["properties.id"], []).append(row["complexQuery"])
+        self.assertEqual([r["properties.id"] for r in rows], list(expected))
+        self.assertEqual([r["complexQuery"] for r in rows], list(expected.values()))
+        self.assertLess(len(rows), len(sequential))
+        self.assertIn(queries[:3], [r["complexQuery"] for r in rows])
+
+    def test_search_journal_opened_once(self):
+        idms = fakeCrawler(fakeTree(depth=1))
+        idms._searchJournal = None
+        barrier = threading.Barrier(8)
+        journals = []
+
+        def worker():
+            barrier.wait()
+            journals.append(idms.searchJournal())
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                threads = [threading.Thread(target=worker) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                os.chdir(cwd)
+                idms._searchJournal.close()
+        self.assertEqual(len(journals), 8)
+        self.assertTrue(all(journal is journals[0] for journal in journals))
+
+    def test_subtree_stats(self):
+        tree = fakeTree(depth=3, width=2, documents=30)
+        empty = tree[2000][-1]["properties"]
+        tree[empty["id"]] = []
+        empty.update(container_size=0, size=0)
+        idms = fakeCrawler(tree)
+        rows = idms.children(2000)
+        requests = []
+        request = idms._request
+        idms._request = lambda method, url, **kwargs: requests.append(url) or request(method, url, **kwargs)
+
+        stats = idms.subtree_stats(2000)
+        documents = [r for r in rows if r["properties.type"] == 144]
+        root = stats[2000]
+        self.assertEqual((root["documents"], root["folders"]), (len(documents), len(rows) - len(documents)))
+        self.assertEqual(root["bytes"], sum(r["properties.size"] for r in documents))
+        self.assertEqual(root["newest"], max(r["properties.modify_date"] for r in rows))
+        self.assertEqual(root["nodeTypes"]["pdf"]["count"], sum(r["nodeType"] == "pdf" for r in documents))
+        self.assertEqual(sum(t["bytes"] for t in root["nodeTypes"].values()), root["bytes"])
+        self.assertEqual(len(stats), len(rows) - len(documents) + 1)
+        self.assertEqual(stats[empty["id"]]["documents"], 0)
+        self.assertFalse(any(f"/{empty['id']}/" in url for url in requests))
+
+        folder = tree[2000][-2]["properties"]["id"]
+        path = stats[folder]["path"]
+        inside = [r for r in documents if r["locationPathString"].startswith(path)]
+        self.assertEqual((stats[folder]["depth"], stats[folder]["documents"]), (2, len(inside)))
+
+        shallow = idms.subtree_stats(2000, maxDepth=2, reportDepth=1)
+        self.assertEqual(list(shallow), [2000])
+        self.assertEqual(shallow[2000]["documents"], 30 + 30)
+        self.assertEqual(shallow[2000]["uncrawledItems"], 2 * 30)
+
+    def test_parent_chain_and_ancestors_cache(self):
+        chain = cs.parentChain.fromList([{"id": 1, "name": "Enterprise"}, {"id": 2, "name": "Map 1"}])
+        child = chain.append({"id": 3, "name": "Map 2"})
+        self.assertEqual(child.path, "Enterprise > Map 1 > Map 2")
+        self.assertEqual(child.path, cs.crawler.flattenParents(None, list(child)))
+        self.assertEqual(len(chain), 2)
+
+        idms = fakeCrawler(fakeTree(depth=1))
+        urls = []
+        request = idms._request
+        idms._request = lambda method, url, **kwargs: urls.append(url) or request(method, url, **kwargs)
+        self.assertEqual(idms.parents(2000), idms.parents("2000"))
+        self.assertEqual(len(urls), 1)
+
+    def test_dotfield_and_column_plan(self):
+        node = {"properties": {"id": 1, "name": "doc"}, "versions": [{"version_number": 3}], "regions": None}
+        self.assertEqual(cs.dotfield(node, "versions.0.version_number"), 3)
+        self.assertEqual(cs.dotfield(node, "versions.-1.version_number"), 3)
+        self.assertIsNone(cs.dotfield(node, "versions.4.version_number"))
+        self.assertIsNone(cs.dotfield(node, "regions.OTLocation"))
+        self.assertEqual(cs.dotfield(node, "properties.name.first"), "")
+
+        columns = ["properties.id", "versions.0.version_number", "regions.OTLocation", "properties.name.first"]
+        plan = cs.columnPlan(columns)
+        self.assertEqual(plan.extract(node), {column: cs.dotfield(node, column) for column in columns})
+
+    def test_retry_after_without_rate_limiter(self):
+        statuses = [429, 429, 200]
+        sent = []
+        responses = []
+
+        class FakeSession:
+            def request(self, method, url, **kwargs):
+                sent.append(time.monotonic())
+                r = FakeResponse({})
+                responses.append(r)
+                r.status_code = statuses.pop(0)
+                r.headers = {"Retry-After": "0.2"} if len(sent) == 2 else {}
+                return r
+
+        idms = cs.crawler("http://localhost", ticket="ticket")
+        idms.rateLimiter = None
+        idms.session = FakeSession()
+        self.assertEqual(idms._request("GET", "http://localhost/api/v2/nodes/2000").status_code, 200)
+        self.assertEqual(len(sent), 3)
+        # Without Retry-After the first retry waits 2 seconds.
+        self.assertGreaterEqual(sent[1] - sent[0], 2.0)
+        self.assertGreaterEqual(sent[2] - sent[1], 0.2)
+        self.assertLess(sent[2] - sent[1], 1.0)
+        self.assertEqual([getattr(r, "closed", False) for r in responses], [True, True, False])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,29 @@
+import asyncio
+import unittest
+
+from tests.test_api import fakeCrawler, fakeData, fakeTree
+
+try:
+    import aiohttp
+    from idms.api.asynccontentserver import asynccrawler
+except ImportError:
+    aiohttp = None
+
+
+@unittest.skipUnless(aiohttp, "aiohttp is not installed")
+class TestAsyncContentServer(unittest.TestCase):
+    def test_children_same_rows(self):
+        tree = fakeTree()
+        idms = asynccrawler("http://localhost", ticket="ticket", maxConcurrency=4)
+        idms.debugJson = False
+
+        async def requestJson(method, url, **kwargs):
+            await asyncio.sleep(0)
+            return fakeData(tree, url)
+
+        idms._requestJson = requestJson
+        self.assertEqual(asyncio.run(idms.children(2000)), fakeCrawler(tree).children(2000))
+
+
+if __name__ == "__main__":
+    unittest.main()
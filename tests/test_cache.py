@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from idms.cache import diskCache, lruCache, searchCache
+from tests.mockserver import fakeTree
+from tests.test_api import fakeCrawler
+
+
+def countingCrawler(tree: dict, posts: list):
+    idms = fakeCrawler(tree)
+    request = idms._request
+    idms._request = lambda method, url, **kwargs: posts.append(kwargs.get("data")) or request(method, url, **kwargs)
+    return idms
+
+
+class TestCache(unittest.TestCase):
+    def test_lru_ttl_and_disk_eviction(self):
+        now = [0.0]
+        cache = lruCache(2, ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.put("c", 3, ttl=100)
+        self.assertEqual((cache.get("a"), cache.get("b")), (None, 2))
+        now[0] = 20
+        self.assertEqual((cache.get("b"), cache.get("c")), (None, 3))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = diskCache(os.path.join(tmp, "cache.sqlite"), ttl=10, maxBytes=2500, clock=lambda: now[0])
+            for i in range(5):
+                disk.put(str(i), {"data": os.urandom(500).hex()})
+                now[0] = now[0] + 1
+            self.assertLessEqual(disk.size(), 2500)
+            self.assertIsNone(disk.get("0"))
+            self.assertEqual(disk.get("4")[1], 1)
+            now[0] = now[0] + 10
+            self.assertIsNone(disk.get("4"))
+            disk.close()
+
+    def test_search_cache(self):
+        tree = fakeTree(depth=2, width=2, documents=40)
+        posts = []
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "search_cache.sqlite")
+            idms = countingCrawler(tree, posts)
+            idms.searchCache = searchCache(path, ttl=3600)
+            rows = idms.search("test query", resume_last_position=False)
+            pages = len(posts)
+            self.assertGreater(pages, 1)
+
+            # Same query (other whitespace) from memory, a new process from disk.
+            again = idms.search("test  query", resume_last_position=False)
+            self.assertEqual([r["properties.id"] for r in again], [r["properties.id"] for r in rows])
+            self.assertEqual(len(posts), pages)
+            self.assertEqual(idms.searchCache.stats()["memoryHits"], pages)
+
+            other = countingCrawler(tree, posts)
+            other.searchCache = searchCache(path, ttl=3600)
+            self.assertEqual(other.search("test query", resume_last_position=False), rows)
+            self.assertEqual(len(posts), pages)
+            self.assertEqual((other.searchCache.stats()["diskHits"], other.searchCache.misses), (pages, 0))
+
+            other.search("test query", limit=25, resume_last_position=False)
+            self.assertGreater(len(posts), pages)
+
+            expired = countingCrawler(tree, posts)
+            expired.searchCache = searchCache(path, ttl=0)
+            requests = len(posts)
+            expired.search("test query", resume_last_position=False)
+            self.assertEqual(len(posts) - requests, pages)
+            for idms in (idms, other, expired):
+                idms.searchCache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import glob
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from idms.debugwriter import debugWriter
+
+
+class TestDebugWriter(unittest.TestCase):
+    def test_rotating_segments(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = debugWriter(tmp, maxSegmentBytes=2000, maxTotalBytes=6000, queueSize=10000)
+            for i in range(3000):
+                writer.write({"results": [{"data": {"properties": {"id": i, "name": os.urandom(8).hex()}}}]})
+            writer.close()
+
+            segments = sorted(glob.glob(os.path.join(tmp, "debug_*.jsonl.gz")))
+            self.assertEqual(segments, sorted(writer.segments))
+            self.assertGreater(writer._segmentNumber, len(segments))
+            self.assertLessEqual(sum(os.path.getsize(s) for s in segments[:-1]), 6000)
+            with gzip.open(segments[-1], "rt") as f:
+                last = [json.loads(line) for line in f]
+            self.assertEqual(last[-1]["data"]["results"][0]["data"]["properties"]["id"], 2999)
+            self.assertEqual(writer.written + writer.dropped, 3000)
+
+    def test_sample_rate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = debugWriter(tmp, sampleRate=0.0)
+            writer.write({"results": []})
+            writer.close()
+            self.assertEqual(writer.skipped, 1)
+            self.assertEqual(os.listdir(tmp), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+
+import idms.api.contentserver as cs
+
+
+class FakeContentResponse:
+    def __init__(self, content: bytes, start: int = 0, failAfter: int = None):
+        self.content = content
+        self.start = start
+        self.failAfter = failAfter
+        self.status_code = 206 if start else 200
+        self.headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunkSize: int):
+        for offset in range(self.start, len(self.content), chunkSize):
+            if self.failAfter is not None and offset >= self.failAfter:
+                raise ConnectionError("connection lost")
+            yield self.content[offset : offset + chunkSize]
+
+
+class TestDownload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.contents = {nodeId: os.urandom(1000 + nodeId) for nodeId in range(1, 21)}
+        self.requests = []
+        self.failAfter = None
+        self.idms = cs.crawler("http://localhost", ticket="ticket")
+        self.idms.debugJson = False
+        self.idms._request = self.fakeRequest
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fakeRequest(self, method: str, url: str, **kwargs):
+        nodeId = int(re.search(r"nodes/(\d+)/content", url).group(1))
+        byteRange = kwargs["headers"].get("Range")
+        self.requests.append((nodeId, byteRange))
+        start = int(byteRange[6:-1]) if byteRange else 0
+        return FakeContentResponse(self.contents[nodeId], start, self.failAfter)
+
+    def rows(self) -> list:
+        return [
+            {"properties.id": nodeId, "properties.name": f"doc/{nodeId}.pdf", "properties.size": len(content)}
+            for nodeId, content in self.contents.items()
+        ]
+
+    def test_download_skip_and_checksums(self):
+        results = self.idms.download(self.rows(), self.tmp.name, workers=4, chunkSize=256)
+        self.assertEqual({r["status"] for r in results}, {"downloaded"})
+        for nodeId, result in zip(self.contents, results):
+            self.assertEqual(result["path"], os.path.join(self.tmp.name, f"{nodeId}_doc_{nodeId}.pdf"))
+            with open(result["path"], "rb") as f:
+                self.assertEqual(f.read(), self.contents[nodeId])
+            self.assertEqual(result["sha256"], hashlib.sha256(self.contents[nodeId]).hexdigest())
+
+        self.requests.clear()
+        again = self.idms.download(self.rows(), self.tmp.name)
+        self.assertEqual(self.requests, [])
+        self.assertEqual([r["status"] for r in again], ["skipped"] * 20)
+        self.assertEqual([r["sha256"] for r in again], [r["sha256"] for r in results])
+
+        with open(os.path.join(self.tmp.name, "download_manifest.jsonl")) as f:
+            self.assertEqual(len([json.loads(line) for line in f]), 20)
+
+        # Without a size the file is downloaded again, a folder is not downloaded.
+        folder = {"properties": {"id": 99, "type": 0, "name": "map"}}
+        results = self.idms.download([3, folder], self.tmp.name)
+        self.assertEqual([r["status"] for r in results], ["downloaded", "folder"])
+
+    def test_download_resume(self):
+        self.failAfter = 512
+        results = self.idms.download(self.rows()[:2], self.tmp.name, chunkSize=256)
+        self.assertEqual([r["status"] for r in results], ["error", "error"])
+        self.assertEqual(os.path.getsize(results[0]["path"] + ".part"), 512)
+
+        self.failAfter = None
+        self.requests.clear()
+        results = self.idms.download(self.rows()[:2], self.tmp.name, chunkSize=256)
+        self.assertEqual(sorted(self.requests), [(1, "bytes=512-"), (2, "bytes=512-")])
+        self.assertEqual([r["status"] for r in results], ["resumed", "resumed"])
+        self.assertEqual(results[1]["sha256"], hashlib.sha256(self.contents[2]).hexdigest())
+        self.assertFalse(os.path.exists(results[1]["path"] + ".part"))
+
+    def test_download_keeps_requests_in_flight(self):
+        idms = cs.crawler("http://localhost", ticket="ticket", maxRequestsInFlight=2)
+        idms.debugJson = False
+        lock = threading.Lock()
+        streams = [0, 0]
+        contents = self.contents
+
+        class FakeStream(FakeContentResponse):
+            def iter_content(self, chunkSize: int):
+                time.sleep(0.02)
+                return super().iter_content(chunkSize)
+
+            def close(self):
+                with lock:
+                    streams[0] = streams[0] - 1
+
+        class FakeSession:
+            def request(self, method, url, **kwargs):
+                with lock:
+                    streams[0] = streams[0] + 1
+                    streams[1] = max(streams)
+                return FakeStream(contents[int(re.search(r"nodes/(\d+)/content", url).group(1))])
+
+        idms.session = FakeSession()
+        results = idms.download(self.rows(), self.tmp.name, workers=8)
+        self.assertEqual({r["status"] for r in results}, {"downloaded"})
+        # Bodies are read within the limit of requests in flight.
+        self.assertEqual(streams, [0, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from idms.journal import crawlJournal
+from tests.test_api import fakeCrawler, fakeTree
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tree = fakeTree(depth=3, width=3, documents=120)
+        self.idms = fakeCrawler(self.tree)
+        self.idms.journal = crawlJournal(os.path.join(self.tmp.name, "journal.sqlite"))
+        self.urls = []
+        request = self.idms._request
+
+        def failingRequest(method, url, **kwargs):
+            if len(self.urls) == self.failAfter:
+                raise ConnectionError("connection lost")
+            self.urls.append(url)
+            return request(method, url, **kwargs)
+
+        self.failAfter = None
+        self.idms._request = failingRequest
+
+    def tearDown(self):
+        self.idms.journal.close()
+        self.tmp.cleanup()
+
+    def test_children_resume(self):
+        expected = fakeCrawler(self.tree).children(2000)
+
+        self.failAfter = 11
+        rows = []
+        with self.assertRaises(ConnectionError):
+            for row in self.idms.iter_children(2000):
+                rows.append(row)
+        self.assertEqual(len(self.idms.journal.pendingFolders("children:2000")), 2)
+
+        self.failAfter = None
+        fetched = len(self.urls)
+        rows.extend(self.idms.iter_children(2000))
+        self.assertEqual(rows, expected)
+        # Of the fetched pages only the current page of the start folder is fetched again.
+        self.assertEqual(len(self.urls) - fetched, len(self.tree) * 2 - (fetched - 1) + 1)
+
+        # A finished crawl starts from scratch.
+        self.assertEqual(self.idms.children(2000), expected)
+
+    def test_children_bfs_resume(self):
+        expected = fakeCrawler(self.tree).children(2000, order="bfs")
+
+        self.failAfter = 9
+        rows = []
+        with self.assertRaises(ConnectionError):
+            for row in self.idms.iter_children(2000, order="bfs"):
+                rows.append(row)
+        self.failAfter = None
+        rows.extend(self.idms.iter_children(2000, order="bfs"))
+        self.assertEqual(rows, expected)
+
+        # Stopped at maxNodes the crawl continues on the next run.
+        first = self.idms.children(2000, order="bfs", maxNodes=1000)
+        self.assertEqual(first + self.idms.children(2000, order="bfs"), expected)
+
+    def test_search_resume(self):
+        expected = fakeCrawler(self.tree).search("test", limit=100, resume_last_position=False)
+
+        self.failAfter = 3
+        self.idms.maxErrorRetry = 1
+        first = self.idms.search("test", limit=100)
+        self.assertEqual(first, expected[:300])
+
+        self.failAfter = None
+        self.assertEqual(len(self.idms.search("other", limit=100, query_id=1)), len(expected))
+        self.assertEqual(self.idms.search("test", limit=100), expected[300:])
+        self.assertEqual(self.idms.search("test", limit=100), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+import idms.api.contentserver as cs
+from idms.metrics import crawlMetrics, endpointName, histogram
+from tests.mockserver import fakeTree, mockContentServer
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_and_endpoint(self):
+        latency = histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value)
+        self.assertEqual(latency.cumulative(), [(0.1, 2), (1.0, 3), ("+Inf", 4)])
+        self.assertEqual(endpointName("http://host/api/v2/nodes/123/nodes?page=2"), "/api/v2/nodes/{id}/nodes")
+        self.assertEqual(endpointName("http://host/api/v1/nodes/123"), "/api/v1/nodes/{id}")
+
+    def test_crawler_metrics(self):
+        tree = fakeTree(depth=2, width=3, documents=150)
+        events = []
+        server = mockContentServer(tree, errorRate=0.2, errorStatus=429, seed=3)
+        with tempfile.TemporaryDirectory() as tmp, server:
+            idms = cs.crawler(server.url, "user", "password")
+            idms.debugJson = False
+            idms.childrenPageSize = None
+            path = os.path.join(tmp, "metrics.prom")
+            idms.metrics = crawlMetrics(hooks=[lambda event, data: events.append(event)], exportPath=path)
+            idms.metrics.exportInterval = 0
+            requests, errors = server.requests, server.errors
+
+            rows = idms.children(2000)
+            data = idms.metrics.snapshot()
+            endpoints = data["endpoints"].values()
+            self.assertEqual(set(data["endpoints"]), {"/api/v1/nodes/{id}/ancestors", "/api/v2/nodes/{id}/nodes"})
+            self.assertEqual(sum(sum(e["status"].values()) for e in endpoints), server.requests - requests)
+            self.assertEqual(sum(e["status"].get("429", 0) for e in endpoints), server.errors - errors)
+            self.assertEqual(sum(e["retries"] for e in endpoints), server.errors - errors)
+            self.assertGreater(server.errors - errors, 0)
+            self.assertGreater(data["endpoints"]["/api/v2/nodes/{id}/nodes"]["responseBytes"], 0)
+            self.assertEqual((data["pages"], data["rows"], data["folders"]), (8, len(rows), 4))
+            self.assertEqual(len(data["slowestFolders"]), 4)
+            self.assertEqual(events.count("folder"), 4)
+
+            with open(path) as f:
+                text = f.read()
+            self.assertIn('idms_request_duration_seconds_bucket{endpoint="/api/v2/nodes/{id}/nodes",le="+Inf"}', text)
+            self.assertIn("idms_rows_total 603", text)
+
+            idms.metrics.export(os.path.join(tmp, "metrics.json"))
+            with open(os.path.join(tmp, "metrics.json")) as f:
+                self.assertEqual(json.load(f)["rows"], 603)
+
+    def test_concurrent_export(self):
+        def failingHook(event, data):
+            raise ValueError("hook")
+
+        errors = []
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics = crawlMetrics(hooks=[failingHook], exportPath=os.path.join(tmp, "metrics.prom"), exportInterval=0)
+
+            def record():
+                try:
+                    for i in range(100):
+                        metrics.recordRequest("GET", f"http://host/api/v2/nodes/{i}/nodes", 200, 0.01)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=record) for _ in range(8)]
+            with self.assertLogs(level="WARNING"):
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(os.listdir(tmp), ["metrics.prom"])
+            metrics.export()
+            with open(os.path.join(tmp, "metrics.prom")) as f:
+                self.assertIn('idms_requests_total{endpoint="/api/v2/nodes/{id}/nodes",status="200"} 800', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import tempfile
+import unittest
+
+import idms.api.contentserver as cs
+from idms.journal import crawlJournal
+from tests.mockserver import fakeTree, mockContentServer
+from tests.test_api import fakeCrawler
+
+
+class TestMockContentServer(unittest.TestCase):
+    def test_crawler_against_mock_server(self):
+        tree = fakeTree(depth=2, width=3, documents=120)
+        with mockContentServer(tree, errorRate=0.1, errorStatus=429, seed=1) as server:
+            idms = cs.crawler(server.url, "user", "password")
+            idms.debugJson = False
+            idms._searchJournal = crawlJournal(":memory:")
+            expected = fakeCrawler(tree)
+            self.assertEqual(idms.children(2000), expected.children(2000))
+            self.assertEqual(idms.search("test", limit=100), expected.search("test", limit=100))
+            self.assertGreater(server.errors, 0)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                results = idms.download(tree[2000][:3], tmp, workers=2)
+            self.assertEqual([r["size"] for r in results], [n["properties"]["size"] for n in tree[2000][:3]])
+
+        with mockContentServer(tree) as server:
+            with self.assertRaises(Exception):
+                cs.crawler(server.url, "user", "")
+
+
+if __name__ == "__main__":
+    unittest.main()
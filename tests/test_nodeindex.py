@@ -0,0 +1,50 @@
+import datetime
+import unittest
+
+from idms.nodeindex import nodeIndex
+from tests.mockserver import fakeTree
+from tests.test_api import fakeCrawler
+
+
+class TestNodeIndex(unittest.TestCase):
+    def test_index_and_query(self):
+        tree = fakeTree(depth=2, width=2, documents=30)
+        tree[2000][0]["properties"].update({"name": "Jaarverslag pipeline 2020", "description": "Gasleiding Noord"})
+        tree[2000][1]["properties"].update({"name": "Inspectie pipeline", "owner": "daniel"})
+        idms = fakeCrawler(tree)
+
+        with nodeIndex(":memory:") as index:
+            self.assertEqual(idms.children(2000, sink=index), 92)
+            self.assertEqual(len(index), 92)
+
+            rows = index.search("pipeline")
+            self.assertEqual({r["properties.id"] for r in rows}, {2001, 2002})
+            self.assertEqual([r["properties.id"] for r in index.search("gasleiding")], [2001])
+            self.assertEqual([r["properties.id"] for r in index.search("pipeline", owner="daniel")], [2002])
+            self.assertEqual(index.search("name:jaar*")[0]["properties.name"], "Jaarverslag pipeline 2020")
+            self.assertEqual(len(index.search("enterprise", limit=None)), 92)
+
+            folders = index.search(type=0, limit=None)
+            self.assertEqual(len(folders), 2)
+            self.assertEqual(len(index.search(type=[0, 144], limit=None)), 92)
+            documents = index.search(type=144, minSize=1010, maxSize=1020, limit=None)
+            self.assertTrue(documents and all(1010 <= r["properties.size"] <= 1020 for r in documents))
+
+            day = datetime.date(2020, 7, 1)
+            modified = index.search(modifiedAfter=day, modifiedBefore=day, limit=None)
+            self.assertEqual([r["properties.modify_date"][:10] for r in modified], ["2020-07-01"])
+            recent = index.search(modifiedAfter="2020-06-01", limit=None)
+            self.assertEqual(recent[0]["properties.modify_date"], max(r["properties.modify_date"] for r in recent))
+
+            # A later crawl only updates changed nodes.
+            tree[2000][0]["properties"].update({"name": "Jaarverslag 2021", "modify_date": "2021-01-01T00:00:00"})
+            rows = idms.children(2000)
+            self.assertEqual(sum(index.write(row) for row in rows), 1)
+            self.assertEqual({r["properties.id"] for r in index.search("pipeline")}, {2002})
+            index.remove([2002])
+            self.assertEqual(index.search("pipeline"), [])
+            self.assertEqual(len(index), 91)
+
+
+if __name__ == "__main__":
+    unittest.main()
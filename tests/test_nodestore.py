@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from idms.nodestore import nodeStore
+from tests.test_api import fakeCrawler, fakeTree
+
+
+class TestNodeStore(unittest.TestCase):
+    def test_incremental_children(self):
+        tree = fakeTree(depth=3, width=2, documents=10)
+        idms = fakeCrawler(tree)
+        urls = []
+        request = idms._request
+        idms._request = lambda method, url, **kwargs: urls.append(url) or request(method, url, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            idms.nodeStore = nodeStore(os.path.join(tmp, "nodes.sqlite"))
+            expected = idms.children(2000)
+
+            # Add a document to one subfolder and touch its modify_date.
+            folder = tree[2000][-1]["properties"]
+            folder["modify_date"] = "2024-01-01T00:00:00"
+            tree[folder["id"]].append({"properties": {"id": 9999, "parent_id": folder["id"], "type": 144}})
+
+            urls.clear()
+            rows = idms.children(2000, incremental=True)
+            fetched = [url.split("/nodes/")[1].split("/")[0] for url in urls if "/nodes?" in url]
+
+            # The store is used from other threads too.
+            with ThreadPoolExecutor(1) as pool:
+                self.assertEqual(pool.submit(idms.children, 2000, incremental=True).result(), rows)
+                stats = pool.submit(idms.subtree_stats, 2000, incremental=True).result()
+            self.assertEqual(stats[2000]["documents"] + stats[2000]["folders"], len(rows))
+            idms.nodeStore.close()
+
+        self.assertEqual(fetched, ["2000", str(folder["id"])])
+        self.assertEqual(len(rows), len(expected) + 1)
+        self.assertIn(9999, [r["properties.id"] for r in rows])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import idms.api.contentserver as cs
+from idms.journal import crawlJournal
+from idms.pagesize import adaptivePageSize
+from tests.mockserver import fakeTree, mockContentServer
+from tests.test_api import fakeCrawler
+
+
+class TestPageSize(unittest.TestCase):
+    def test_adaptive_page_size(self):
+        tuner = adaptivePageSize(sizes=(25, 50, 100, 200), initial=100, targetSeconds=1.0, maxBytes=100000)
+        tuner.record(100, 0.1, 10000)
+        self.assertEqual(tuner.size(), 200)
+        tuner.record(200, 20.0, 20000)
+        self.assertEqual(tuner.size(), 25)
+        tuner.record(0, 5.0, 0)
+        self.assertEqual(tuner.size(), 25)
+
+        self.assertEqual(adaptivePageSize.nextPage(1, 100, 200), (2, 100))
+        self.assertEqual(adaptivePageSize.nextPage(2, 100, 200), (2, 200))
+        self.assertEqual(adaptivePageSize.nextPage(3, 100, 200), (4, 100))
+        self.assertEqual(adaptivePageSize.nextPage(1, 100, 25), (5, 25))
+        resize = cs.crawler._resizeSearchUrl
+        self.assertEqual(resize("/api/v2/search?limit=50&page=3", 100), "/api/v2/search?limit=100&page=2")
+        self.assertEqual(resize("/api/v2/search?limit=50&page=2", 100), "/api/v2/search?limit=50&page=2")
+
+    def test_adaptive_pages_same_rows(self):
+        tree = fakeTree(depth=2, width=3, documents=250)
+        expected = fakeCrawler(tree)
+        with mockContentServer(tree) as server:
+            idms = cs.crawler(server.url, "user", "password")
+            idms.debugJson = False
+            idms._searchJournal = crawlJournal(":memory:")
+
+            # Slow pages: switch from 100 to 25 rows after the first page.
+            idms.childrenPageSize = adaptivePageSize(targetSeconds=0.0)
+            requests = server.requests
+            self.assertEqual(idms.children(2000), expected.children(2000))
+            self.assertGreater(server.requests - requests, 16)
+            self.assertIsNotNone(idms._prefetchPool)
+
+            # Fast pages: grow to 400 rows.
+            idms.childrenPageSize = adaptivePageSize(targetSeconds=60.0)
+            requests = server.requests
+            self.assertEqual(idms.children(2000), expected.children(2000))
+            self.assertLess(server.requests - requests, 16)
+
+            idms.prefetch = False
+            idms.childrenPageSize = None
+            self.assertEqual(idms.children(2000), expected.children(2000))
+
+            idms.prefetch = True
+            idms.searchPageSize = adaptivePageSize(initial=25, targetSeconds=60.0)
+            rows = idms.search("test", resume_last_position=False)
+            self.assertEqual(rows, expected.search("test", limit=100, resume_last_position=False))
+            self.assertEqual(idms.searchPageSize.size(), 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from idms.ratelimit import adaptiveRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def test_token_bucket(self):
+        clock = FakeClock()
+        limiter = adaptiveRateLimiter(rate=10, burst=2, clock=clock)
+        self.assertEqual([limiter.reserve() for _ in range(4)], [0.0, 0.0, 0.1, 0.2])
+        clock.now = clock.now + 1
+        self.assertEqual(limiter.reserve(), 0.0)
+
+    def test_aimd(self):
+        self.assertEqual(adaptiveRateLimiter().rate, adaptiveRateLimiter().maxRate)
+
+        clock = FakeClock()
+        limiter = adaptiveRateLimiter(rate=10, increase=1, minRate=1, maxRate=100, clock=clock)
+        # Slow start until the server shows load.
+        for _ in range(39):
+            limiter.record(0.1, 200)
+        self.assertAlmostEqual(limiter.rate, 49)
+
+        # The first decrease starts from the 40 requests of the last second.
+        clock.now = clock.now + 1
+        limiter.record(0.1, 503)
+        # Failures in the same latency period count as one overload.
+        limiter.record(0.1, 503)
+        self.assertAlmostEqual(limiter.rate, 20)
+        self.assertEqual(limiter.decreases, 1)
+        for _ in range(20):
+            limiter.record(0.1, 200)
+        self.assertAlmostEqual(limiter.rate, 21, places=1)
+
+        clock.now = clock.now + 10
+        limiter.record(0.1, 429, retryAfter=30)
+        self.assertEqual(limiter.throttled, 1)
+        self.assertAlmostEqual(limiter.reserve(), 30)
+
+        clock.now = clock.now + 40
+        limiter.record(60, 200)
+        self.assertEqual(limiter.decreases, 3)
+
+if __name__ == "__main__":
+    unittest.main()
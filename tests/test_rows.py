@@ -0,0 +1,73 @@
+import os
+import pickle
+import tempfile
+import tracemalloc
+import unittest
+
+from idms.nodeindex import nodeIndex
+from idms.rows import compactRow, pd, toDataFrame, toDicts
+from idms.sinks import csvSink
+from tests.mockserver import fakeTree
+from tests.test_api import fakeCrawler
+
+
+def rowMemory(idms, nodeId) -> int:
+    tracemalloc.start()
+    try:
+        rows = idms.children(nodeId)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del rows
+    return size
+
+
+class TestCompactRows(unittest.TestCase):
+    def test_same_rows_as_dicts(self):
+        tree = fakeTree(depth=2, width=3, documents=50)
+        idms = fakeCrawler(tree)
+        expected = idms.children(2000)
+        searchRows = idms.search("test", limit=50)
+        idms.compactRows = True
+        rows = idms.children(2000)
+
+        self.assertTrue(all(isinstance(row, compactRow) for row in rows))
+        self.assertEqual(rows, expected)
+        self.assertEqual(toDicts(rows), expected)
+        self.assertEqual(list(rows[0].keys()), list(expected[0].keys()))
+        self.assertEqual(rows[0]["downloadUrl"], expected[0]["downloadUrl"])
+        self.assertIs(rows[0]["locationPathString"], rows[1]["locationPathString"])
+        self.assertEqual(pickle.loads(pickle.dumps(rows[0])), expected[0])
+        with self.assertRaises(KeyError):
+            rows[0]["unknown"]
+        self.assertIsNone(rows[0].get("unknown"))
+
+        self.assertEqual(idms.search("test", limit=50), searchRows)
+        merged = idms.search_many(["test", "other"], limit=50)
+        self.assertEqual(merged[0]["complexQuery"], ["test", "other"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, data in (("dicts.csv", expected), ("compact.csv", rows)):
+                with csvSink(os.path.join(tmp, name)) as sink:
+                    sink.writeRows(data)
+            with open(os.path.join(tmp, "dicts.csv")) as a, open(os.path.join(tmp, "compact.csv")) as b:
+                self.assertEqual(a.read(), b.read())
+        with nodeIndex(":memory:") as index:
+            index.writeRows(rows)
+            self.assertEqual(len(index.search("enterprise", limit=None)), len(rows))
+
+        if pd is not None:
+            self.assertEqual(toDataFrame(rows).shape, (len(rows), len(expected[0])))
+
+    def test_memory(self):
+        tree = fakeTree(depth=1, width=0, documents=5000)
+        idms = fakeCrawler(tree)
+        idms.prefetch = False
+        dictRows = rowMemory(idms, 2000)
+        idms.compactRows = True
+        compactRows = rowMemory(idms, 2000)
+        self.assertLess(compactRows * 3, dictRows)
+
+
+if __name__ == "__main__":
+    unittest.main()
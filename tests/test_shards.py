@@ -0,0 +1,50 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import idms.api.contentserver as cs
+from idms.shards import shardedCrawl
+from tests.mockserver import fakeTree, mockContentServer
+
+
+def readRows(directory: str, manifest: dict) -> list:
+    rows = []
+    for entry in manifest["shards"]:
+        with open(os.path.join(directory, entry["path"]), newline="", encoding="utf-8") as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+class TestShardedCrawl(unittest.TestCase):
+    def test_sharded_crawl(self):
+        tree = fakeTree(depth=3, width=3, documents=40)
+        with tempfile.TemporaryDirectory() as tmp, mockContentServer(tree) as server:
+            idms = cs.crawler(server.url, "user", "password")
+            idms.debugJson = False
+            expected = {row["properties.id"]: row["locationPathString"] for row in idms.children(2000)}
+
+            sharded = shardedCrawl(server.url, "user", "password", processes=2)
+            sharded.crawler.debugJson = False
+            manifest = sharded.run([2000], tmp, split=True)
+            self.assertEqual([e["status"] for e in manifest["shards"]], ["done"] * 4)
+            self.assertEqual(manifest["shards"][0]["path"], "shard_2000_root.csv")
+            rows = readRows(tmp, manifest)
+            self.assertEqual(manifest["rows"], len(expected))
+            self.assertEqual({int(r["properties.id"]): r["locationPathString"] for r in rows}, expected)
+            self.assertEqual(sharded.readManifest(tmp), manifest)
+            # The workers use the ticket of the driver.
+            self.assertEqual(server.auths, 2)
+
+            # Done shards are skipped when running again.
+            requests = server.requests
+            self.assertEqual(sharded.run([2000], tmp, split=True)["rows"], len(expected))
+            self.assertLess(server.requests - requests, 5)
+
+            subfolders = [n["properties"]["id"] for n in tree[2000] if n["properties"]["type"] == 0]
+            manifest = sharded.run(subfolders, os.path.join(tmp, "nodes"))
+            self.assertEqual(manifest["rows"], len(expected) - len(tree[2000]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from idms.sinks import csvSink, parquetSink, excelSink, pa, Workbook
+from tests.test_api import fakeCrawler, fakeTree
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.idms = fakeCrawler(fakeTree(depth=2, width=2, documents=30))
+        self.rows = self.idms.children(2000)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_csv(self):
+        path = os.path.join(self.tmp.name, "rows.csv")
+        with csvSink(path, rowGroupSize=7) as sink:
+            self.assertEqual(self.idms.children(2000, sink=sink), len(self.rows))
+        with open(path, newline="", encoding="utf-8") as f:
+            written = list(csv.DictReader(f))
+        self.assertEqual(len(written), len(self.rows))
+        self.assertEqual(written[5]["locationPathString"], self.rows[5]["locationPathString"])
+        self.assertEqual(written[5]["nodeType"], self.rows[5]["nodeType"])
+
+    @unittest.skipUnless(pa, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.tmp.name, "rows.parquet")
+        with parquetSink(path, rowGroupSize=10) as sink:
+            sink.writeRows(self.rows)
+        table = pq.read_table(path)
+        self.assertEqual(table.num_rows, len(self.rows))
+        self.assertTrue(pa.types.is_dictionary(table.schema.field("nodeType").type))
+        self.assertEqual(table.column("properties.id").to_pylist(), [r["properties.id"] for r in self.rows])
+
+    @unittest.skipUnless(pa, "pyarrow is not installed")
+    def test_parquet_types_across_groups(self):
+        import pyarrow.parquet as pq
+
+        columns = {
+            "empty": [None, None, 5, 6, None, 7],
+            "size": [1, 2, "", 3, 4, 5],
+            "version": [1, 2, 3, 2.5, 4, 5],
+            "nodeType": ["pdf", None, "word", "pdf", "pdf", "image"],
+        }
+        rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        path = os.path.join(self.tmp.name, "types.parquet")
+        with parquetSink(path, rowGroupSize=2) as sink:
+            sink.writeRows(rows)
+
+        self.assertEqual(os.listdir(self.tmp.name), ["types.parquet"])
+        self.assertEqual(pq.ParquetFile(path).num_row_groups, 3)
+        table = pq.read_table(path)
+        self.assertEqual(table.schema.field("empty").type, pa.int64())
+        self.assertEqual(table.schema.field("size").type, pa.string())
+        self.assertEqual(table.schema.field("version").type, pa.float64())
+        self.assertEqual(table.column("empty").to_pylist(), columns["empty"])
+        self.assertEqual(table.column("size").to_pylist(), ["1", "2", "", "3", "4", "5"])
+        self.assertEqual(table.column("version").to_pylist(), columns["version"])
+        self.assertEqual(table.column("nodeType").to_pylist(), columns["nodeType"])
+
+    @unittest.skipUnless(Workbook, "openpyxl is not installed")
+    def test_excel(self):
+        from openpyxl import load_workbook
+
+        path = os.path.join(self.tmp.name, "rows.xlsx")
+        with excelSink(path, rowGroupSize=10) as sink:
+            sink.maxSheetRows = 50
+            sink.writeRows(self.rows)
+        sheets = load_workbook(path).worksheets
+        self.assertEqual(len(sheets), 2)
+        self.assertEqual(sum(len(list(sheet.iter_rows())) - 1 for sheet in sheets), len(self.rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
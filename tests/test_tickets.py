@@ -0,0 +1,92 @@
+import os
+import stat
+import tempfile
+import threading
+import unittest
+
+import idms.api.contentserver as cs
+from idms.tickets import ticketManager
+from tests.mockserver import fakeTree, mockContentServer
+
+
+class TestTickets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.tmp.name, "tickets.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_single_refresh_for_many_workers(self):
+        logins = []
+        barrier = threading.Barrier(8)
+        tickets = ticketManager(lambda: logins.append(1) or f"ticket{len(logins)}")
+        stale = tickets.get()
+
+        def worker(results: list):
+            barrier.wait()
+            results.append(tickets.refresh(stale))
+
+        results = []
+        threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["ticket2"] * 8)
+        self.assertEqual(len(logins), 2)
+
+        with self.assertRaises(Exception):
+            ticketManager().refresh()
+
+    def test_cache_and_idle_timeout(self):
+        now = [1000.0]
+        first = ticketManager(lambda: "ticket1", self.cache, "url|user", idleTimeout=60, clock=lambda: now[0])
+        self.assertEqual(first.get(), "ticket1")
+        self.assertEqual(stat.S_IMODE(os.stat(self.cache).st_mode), 0o600)
+        with open(self.cache) as f:
+            self.assertNotIn("user", f.read())
+
+        second = ticketManager(lambda: "ticket2", self.cache, "url|user", idleTimeout=60, clock=lambda: now[0])
+        self.assertEqual((second.get(), second.refreshes), ("ticket1", 0))
+        other = ticketManager(lambda: "ticket3", self.cache, "url|other", idleTimeout=60, clock=lambda: now[0])
+        self.assertEqual(other.get(), "ticket3")
+
+        now[0] = now[0] + 61
+        self.assertEqual(second.get(), "ticket2")
+
+        # A given ticket without credentials is used until the server rejects it.
+        given = ticketManager(idleTimeout=60, clock=lambda: now[0])
+        given.set("given")
+        now[0] = now[0] + 3600
+        self.assertEqual((given.get(), given.refreshes), ("given", 0))
+
+    def test_crawler_reauthorizes(self):
+        tree = fakeTree(depth=2, width=3, documents=150)
+        with mockContentServer(tree) as server:
+            idms = cs.crawler(server.url, "user", "password", ticketCache=self.cache)
+            idms.debugJson = False
+            expected = idms.children(2000)
+
+            again = cs.crawler(server.url, "user", "password", ticketCache=self.cache)
+            again.debugJson = False
+            self.assertEqual(server.auths, 1)
+
+            # Expired while crawling: the page is fetched again with a new ticket.
+            rows = []
+            for row in again.iter_children(2000):
+                if len(rows) == 200:
+                    server.expireTickets()
+                rows.append(row)
+            self.assertEqual(rows, expected)
+            self.assertEqual(server.auths, 2)
+
+            # Workers share one new ticket.
+            server.expireTickets()
+            idms.ancestorsCache.clear()
+            self.assertEqual(idms.children_concurrent(2000, workers=8), expected)
+            self.assertEqual(server.auths, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import re
+import tempfile
+import unittest
+
+from idms.watch import folderWatch
+from tests.mockserver import fakeTree
+from tests.test_api import fakeCrawler
+
+
+def touch(tree: dict, nodeId: int, modifyDate: str):
+    """
+    Set the modify_date of a node and, like Content Server, of the folders above it.
+    """
+    nodes = {n["properties"]["id"]: n for children in tree.values() for n in children}
+    while nodeId in nodes:
+        nodes[nodeId]["properties"]["modify_date"] = modifyDate
+        nodeId = nodes[nodeId]["properties"]["parent_id"]
+
+
+class TestFolderWatch(unittest.TestCase):
+    def test_poll_events(self):
+        tree = fakeTree(depth=3, width=2, documents=30)
+        idms = fakeCrawler(tree)
+        urls = []
+        request = idms._request
+        idms._request = lambda method, url, **kwargs: urls.append(url) or request(method, url, **kwargs)
+
+        def fetched() -> list:
+            nodeIds = [int(re.search(r"nodes/(\d+)/nodes", url).group(1)) for url in urls if "/nodes?" in url]
+            urls.clear()
+            return nodeIds
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "watch.sqlite")
+            with folderWatch(idms, [2000], path) as watch:
+                self.assertEqual(list(watch.poll()), [])
+                self.assertEqual(sorted(fetched()), sorted(tree))
+                self.assertEqual(list(watch.poll()), [])
+                self.assertEqual(fetched(), [2000])
+
+                folder = tree[2000][-1]["properties"]["id"]
+                deep = tree[folder][-1]["properties"]["id"]
+                other = tree[2000][-2]["properties"]["id"]
+                added = {"properties": {"id": 9000, "parent_id": deep, "type": 144, "name": "nieuw"}}
+                tree[deep].append(added)
+                touch(tree, 9000, "2021-03-01T10:00:00")
+                changed = tree[2000][0]["properties"]["id"]
+                touch(tree, changed, "2021-03-01T11:00:00")
+                removed = tree[other].pop(0)["properties"]["id"]
+                touch(tree, other, "2021-03-01T12:00:00")
+
+                events = list(watch.poll())
+                documents = {(e["event"], e["id"]) for e in events if e["id"] not in tree}
+                self.assertEqual(documents, {("added", 9000), ("changed", changed), ("removed", removed)})
+                self.assertEqual({e["id"] for e in events if e["event"] == "changed"}, {changed, folder, deep, other})
+                self.assertEqual(sorted(fetched()), sorted([2000, folder, deep, other, other]))
+                row = next(e["row"] for e in events if e["id"] == 9000)
+                self.assertEqual(row["properties.name"], "nieuw")
+                self.assertEqual(row["locationPathString"], f"Enterprise > n{folder} > n{deep}")
+
+                # A removed subfolder is reported once, its folders are no longer polled.
+                removedFolder = tree[folder].pop(-2)["properties"]["id"]
+                touch(tree, folder, "2021-03-02T10:00:00")
+                events = list(watch.poll())
+                self.assertIn({"event": "removed", "id": removedFolder, "folderId": folder, "row": None}, events)
+                self.assertIsNone(watch.folder(removedFolder))
+                fetched()
+
+            # The checkpoint is kept on disk.
+            with folderWatch(idms, [2000], path) as watch:
+                self.assertEqual(list(watch.poll()), [])
+                self.assertEqual(fetched(), [2000])
+
+            # An interrupted first poll continues with the folders that were not polled.
+            with folderWatch(idms, [2000], os.path.join(tmp, "initial.sqlite"), emitInitial=True) as watch:
+                first = []
+                for event in watch.poll():
+                    first.append(event["id"])
+                    if len(first) == len(tree[2000]) + 1:
+                        break
+                rest = [event["id"] for event in watch.poll()]
+                expected = sorted(row["properties.id"] for row in idms.children(2000))
+                self.assertEqual(sorted(set(first + rest)), expected)
+                self.assertEqual(list(watch.poll()), [])
+
+    def test_moved_in_with_older_date(self):
+        tree = fakeTree(depth=3, width=2, documents=10)
+        idms = fakeCrawler(tree)
+        urls = []
+        request = idms._request
+        idms._request = lambda method, url, **kwargs: urls.append(url) or request(method, url, **kwargs)
+
+        with folderWatch(idms, [2000], ":memory:") as watch:
+            self.assertEqual(list(watch.poll()), [])
+            source, target = tree[2000][-1]["properties"]["id"], tree[2000][-2]["properties"]["id"]
+            # A document and a folder keep their old modify_date when they are moved, the folders get a new one.
+            moved = [tree[source].pop(0), tree[source].pop(-1)]
+            for node in moved:
+                node["properties"]["parent_id"] = target
+                tree[target].append(node)
+            touch(tree, source, "2021-03-01T10:00:00")
+            touch(tree, target, "2021-03-01T10:00:00")
+
+            events = list(watch.poll())
+            movedIds = {n["properties"]["id"] for n in moved}
+            added = {(e["id"], e["folderId"]) for e in events if e["event"] == "added"}
+            self.assertEqual(added, {(nodeId, target) for nodeId in movedIds})
+            # The moved folder keeps its checkpoint, its children did not change.
+            self.assertEqual({e["id"] for e in events} - movedIds, {source, target})
+            self.assertIsNotNone(watch.folder(moved[1]["properties"]["id"]))
+
+            urls.clear()
+            self.assertEqual(list(watch.poll()), [])
+            self.assertEqual(len([url for url in urls if "/nodes?" in url]), 1)
+
+            # The children of a new folder are reported too.
+            tree[target].append({"properties": {"id": 9100, "parent_id": target, "type": 0, "name": "nieuw"}})
+            tree[9100] = [{"properties": {"id": 9101, "parent_id": 9100, "type": 144, "name": "doc"}}]
+            touch(tree, 9101, "2021-03-02T10:00:00")
+            events = {(e["event"], e["id"]) for e in watch.poll()}
+            self.assertEqual(events, {("changed", target), ("added", 9100), ("added", 9101)})
+
+
+if __name__ == "__main__":
+    unittest.main()